@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Profile, Country, State
+from .models import Profile, Country, State, District, City, PostalCode
 
 
 class ProfileAdmin(admin.ModelAdmin):
@@ -9,6 +9,7 @@ class ProfileAdmin(admin.ModelAdmin):
         'country',
         'state',
         'city',
+        'canonical_city',
         'active_educational_need',
     )
 admin.site.register(Profile, ProfileAdmin)
@@ -24,10 +25,45 @@ class StateAdmin(admin.ModelAdmin):
 admin.site.register(State, StateAdmin)
 
 
+class DistrictAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'name',
+        'state',
+    )
+    list_filter = ('state',)
+    search_fields = ('name',)
+admin.site.register(District, DistrictAdmin)
+
+
+class CityAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'name',
+        'alternate_names',
+        'district',
+        'state',
+    )
+    list_filter = ('state',)
+    search_fields = ('name', 'alternate_names')
+admin.site.register(City, CityAdmin)
+
+
 class CountryAdmin(admin.ModelAdmin):
     list_display = (
         'id',
         'name',
         'code',
     )
-admin.site.register(Country, CountryAdmin)
\ No newline at end of file
+admin.site.register(Country, CountryAdmin)
+
+class PostalCodeAdmin(admin.ModelAdmin):
+    list_display = (
+        'code',
+        'place_name',
+        'country',
+        'latitude',
+        'longitude',
+    )
+    search_fields = ('code', 'place_name')
+admin.site.register(PostalCode, PostalCodeAdmin)
@@ -1,6 +1,20 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
-from django.db.models import Q
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+
+from janani_home.cache import bump_namespace, versioned_key
+from . import throttling
+
+
+def _user_namespace(user_id):
+    return 'accounts:user:{}'.format(user_id)
+
+
+def invalidate_cached_user(user_id):
+    """Move the cached user to a new version, e.g. after user/profile saves."""
+    bump_namespace(_user_namespace(user_id))
 
 
 class CustomModelBackend(ModelBackend):
@@ -11,13 +25,47 @@ class CustomModelBackend(ModelBackend):
 
         if username is None:
             username = kwargs.get(UserModel.USERNAME_FIELD)
-        try:
-            user = UserModel.objects.get(Q(username__iexact=username) | Q(email__iexact=username))
+        if not username:
+            return None
+        if request is not None and not throttling.consume(request, username):
+            # Refuse before hashing anything; authenticate() stops here too
+            raise PermissionDenied
 
-            if user.check_password(password):
-                return user
+        # Look the username up first and the email second, so that each
+        # query can use its case-insensitive index (see accounts migration
+        # 0015) and a username matching another user's email can't fail.
+        users = UserModel._default_manager
+        user = (users.filter(username__iexact=username).first() or
+                users.filter(email__iexact=username).first())
 
-        except UserModel.DoesNotExist:
+        if user is None:
             # Run the default password hasher once to reduce the timing
             # difference between an existing and a non-existing user (#20760).
-            UserModel().set_password(password)
\ No newline at end of file
+            UserModel().set_password(password)
+        elif user.check_password(password):
+            if request is not None:
+                # Only failures count; users behind a shared IP keep logging in
+                throttling.refund(request, username)
+            return user
+
+    def get_user(self, user_id):
+        """
+        Load the user of the session together with its profile, country and
+        state in a single query. With AUTH_USER_CACHE_TIMEOUT set, the result
+        is also cached until the user or the profile is saved.
+        """
+        timeout = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 0)
+        if timeout:
+            key = versioned_key(_user_namespace(user_id))
+            user = cache.get(key)
+            if user is not None:
+                return user if self.user_can_authenticate(user) else None
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related(
+                'profile', 'profile__country', 'profile__state').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        if timeout:
+            cache.set(key, user, timeout)
+        return user if self.user_can_authenticate(user) else None
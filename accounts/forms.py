@@ -19,7 +19,7 @@ class SignupForm(UserCreationForm):
         email = cleaned_data.get('email')
         if username and User.objects.filter(username__iexact=username).exists():
             self.add_error('username', 'A user with that username already exists.')
-        if email and User.objects.filter(email=email).exclude(username=username).exists():
+        if email and User.objects.filter(email__iexact=email).exclude(username=username).exists():
             self.add_error('email', 'A user with that email already exists.')
         return cleaned_data
 
@@ -82,7 +82,7 @@ class UserForm(forms.ModelForm):
         cleaned_data = super(UserForm, self).clean()
         email = cleaned_data.get('email')
         username = cleaned_data.get('username')
-        if email and User.objects.filter(email=email).exclude(username=username).exists():
+        if email and User.objects.filter(email__iexact=email).exclude(username=username).exists():
             self.add_error('email', 'A user with that email already exists.')
         return cleaned_data
 
@@ -102,7 +102,7 @@ class OrganizationUserForm(forms.ModelForm):
         cleaned_data = super(OrganizationUserForm, self).clean()
         email = cleaned_data.get('email')
         username = cleaned_data.get('username')
-        if email and User.objects.filter(email=email).exclude(username=username).exists():
+        if email and User.objects.filter(email__iexact=email).exclude(username=username).exists():
             self.add_error('email', 'A user with that email already exists.')
         return cleaned_data
 
@@ -187,7 +187,7 @@ class OrganizationSignupForm(UserCreationForm):
         email = cleaned_data.get('email')
         if username and User.objects.filter(username__iexact=username).exists():
             self.add_error('username', 'Account with that username already exists.')
-        if email and User.objects.filter(email=email).exclude(username=username).exists():
+        if email and User.objects.filter(email__iexact=email).exclude(username=username).exists():
             self.add_error('email', 'Account with that email already exists.')
         return cleaned_data
 
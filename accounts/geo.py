@@ -0,0 +1,167 @@
+"""
+Offline geocoding and proximity search.
+
+Profiles are geocoded from their postal code or city with the PostalCode
+table (loaded by `manage.py load_postal_codes`) and store the geohash of
+their coordinates. A radius search reads the profiles whose geohash starts
+with one of the few cells covering the bounding box of the circle, all
+index range scans, keeps those inside the box itself in SQL, and then sorts
+the candidates by their exact great-circle distance.
+"""
+import math
+
+from django.db.models import Q
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0
+# Most geohash prefixes a radius search ORs together
+MAX_SEARCH_CELLS = 32
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Returns the geohash of a point."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    geohash = []
+    bits = bit_count = 0
+    even = True
+    while len(geohash) < precision:
+        interval, value = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits = bit_count = 0
+    return ''.join(geohash)
+
+
+def cell_size(precision):
+    """Returns the (height, width) in degrees of geohash cells of a precision."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def bounding_box(latitude, longitude, km):
+    """
+    Returns the (south, west, north, east) degrees of the smallest box around
+    a circle of radius km. west and east are not wrapped, so west < -180 or
+    east > 180 when the box crosses the antimeridian.
+    """
+    distance = km / EARTH_RADIUS_KM
+    south = max(-90.0, latitude - math.degrees(distance))
+    north = min(90.0, latitude + math.degrees(distance))
+    shrink = math.cos(math.radians(latitude))
+    if south == -90.0 or north == 90.0 or math.sin(distance) >= shrink:
+        # The circle reaches a pole, so it spans every longitude
+        return south, -180.0, north, 180.0
+    width = math.degrees(math.asin(math.sin(distance) / shrink))
+    return south, longitude - width, north, longitude + width
+
+
+def box_filter(south, west, north, east):
+    """Returns the Q of the coordinates inside a bounding box."""
+    box = Q(latitude__range=(south, north))
+    if east - west >= 360.0:
+        return box
+    if west < -180.0:
+        return box & (Q(longitude__gte=west + 360.0) | Q(longitude__lte=east))
+    if east > 180.0:
+        return box & (Q(longitude__gte=west) | Q(longitude__lte=east - 360.0))
+    return box & Q(longitude__range=(west, east))
+
+
+def covering_cells(south, west, north, east):
+    """
+    Returns the geohashes of the cells covering a bounding box, at the
+    longest precision that needs no more than MAX_SEARCH_CELLS of them, or
+    an empty list when even the shortest does.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = int((north - south) / height) + 2
+        columns = int((east - west) / width) + 2
+        if rows * columns > MAX_SEARCH_CELLS:
+            continue
+        # Steps one cell apart, plus the far edges, touch every covering cell
+        lats = [min(north, south + row * height) for row in range(rows - 1)] + [north]
+        lngs = [min(east, west + column * width) for column in range(columns - 1)] + [east]
+        return sorted({
+            encode_geohash(lat, (lng + 180.0) % 360.0 - 180.0, precision)
+            for lat in lats for lng in lngs})
+    return []
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """Returns the great-circle distance between two points in km."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def place_key(name):
+    """Normalizes a place name for lookups."""
+    return ' '.join((name or '').lower().split())
+
+
+def geocode(country_id, zip_code, city):
+    """
+    Returns the PostalCode matching a postal code, or else a city, in a
+    country (any country when country_id is None), or None.
+    """
+    from .models import PostalCode
+
+    places = PostalCode.objects.all()
+    if country_id:
+        places = places.filter(country_id=country_id)
+    zip_code = (zip_code or '').strip().upper()
+    if zip_code:
+        place = places.filter(code=zip_code).order_by('pk').first()
+        if place is not None:
+            return place
+    if place_key(city):
+        return places.filter(place_key=place_key(city)).order_by('pk').first()
+    return None
+
+
+class NearbyProfiles(object):
+    """
+    Profiles of a queryset within km of a point, nearest first, as a sequence
+    for the paginator. Only the coordinates of the candidates are read up
+    front; profiles are loaded a page at a time and get a distance attribute.
+    """
+
+    def __init__(self, queryset, latitude, longitude, km):
+        self.queryset = queryset
+        box = bounding_box(latitude, longitude, km)
+        candidates = queryset.exclude(geohash='').filter(box_filter(*box))
+        cells = covering_cells(*box)
+        if cells:
+            prefixes = Q()
+            for cell in cells:
+                prefixes |= Q(geohash__startswith=cell)
+            candidates = candidates.filter(prefixes)
+        distances = (
+            (haversine(latitude, longitude, lat, lng), pk)
+            for pk, lat, lng in candidates.values_list('pk', 'latitude', 'longitude').order_by())
+        self.results = sorted((distance, pk) for distance, pk in distances if distance <= km)
+
+    def __len__(self):
+        return len(self.results)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        page = self.results[index]
+        profiles = self.queryset.in_bulk([pk for distance, pk in page])
+        for distance, pk in page:
+            profiles[pk].distance = distance
+        return [profiles[pk] for distance, pk in page]
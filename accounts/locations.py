@@ -0,0 +1,60 @@
+"""
+Matching of the free text city and district of profiles to the City and
+District reference tables of their state.
+
+A name matches a city by its name or one of its alternate names, ignoring
+case and spacing, or else by the closest of them with a difflib similarity
+of at least MATCH_CUTOFF, which catches most typos.
+"""
+import difflib
+
+from .geo import place_key
+
+MATCH_CUTOFF = 0.85
+
+
+def _best_match(name, names, cutoff):
+    key = place_key(name)
+    if not key:
+        return None
+    if key in names:
+        return names[key]
+    close = difflib.get_close_matches(key, names.keys(), 1, cutoff)
+    return names[close[0]] if close else None
+
+
+def city_names(state_id):
+    """Returns the normalized names and alternate names of the cities of a state."""
+    from .models import City
+
+    names = {}
+    for pk, name, alternate_names in City.objects.filter(state_id=state_id).values_list(
+            'pk', 'name', 'alternate_names'):
+        for alias in alternate_names.split(','):
+            if place_key(alias):
+                names.setdefault(place_key(alias), pk)
+        # Names win over alternate names of other cities
+        names[place_key(name)] = pk
+    return names
+
+
+def district_names(state_id):
+    """Returns the normalized names of the districts of a state."""
+    from .models import District
+
+    return {place_key(name): pk for pk, name in
+            District.objects.filter(state_id=state_id).values_list('pk', 'name')}
+
+
+def match_city(state_id, name, cutoff=MATCH_CUTOFF):
+    """Returns the pk of the City of a state matching name, or None."""
+    if not state_id:
+        return None
+    return _best_match(name, city_names(state_id), cutoff)
+
+
+def match_district(state_id, name, cutoff=MATCH_CUTOFF):
+    """Returns the pk of the District of a state matching name, or None."""
+    if not state_id:
+        return None
+    return _best_match(name, district_names(state_id), cutoff)
@@ -0,0 +1,61 @@
+import csv
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.geo import place_key
+from accounts.models import Country, PostalCode, Profile
+
+BUNDLED_DATASET = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, 'data', 'postal_codes.txt')
+
+
+class Command(BaseCommand):
+    help = ('Loads postal codes and their coordinates from a file in the GeoNames '
+            'postal code format (tab separated, e.g. IN.txt from '
+            'download.geonames.org/export/zip/) and geocodes the profiles. '
+            'Without a file the bundled dataset of major Indian cities is loaded.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=BUNDLED_DATASET)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        countries = dict(Country.objects.values_list('code', 'pk'))
+        if not countries:
+            raise CommandError('Load the countries first: manage.py loaddata countries_and_states')
+        try:
+            dataset = open(options['path'], encoding='utf-8', newline='')
+        except OSError as e:
+            raise CommandError(e)
+
+        loaded = 0
+        with dataset, transaction.atomic():
+            replaced = set()
+            batch = []
+            for row in csv.reader(dataset, delimiter='\t', quoting=csv.QUOTE_NONE):
+                if len(row) < 11 or row[0] not in countries or not row[9] or not row[10]:
+                    continue
+                country_id = countries[row[0]]
+                # A file replaces the codes of the countries it contains
+                if country_id not in replaced:
+                    PostalCode.objects.filter(country_id=country_id).delete()
+                    replaced.add(country_id)
+                batch.append(PostalCode(
+                    country_id=country_id, code=row[1].strip().upper(), place_name=row[2],
+                    place_key=place_key(row[2]), latitude=float(row[9]), longitude=float(row[10])))
+                if len(batch) >= options['batch_size']:
+                    PostalCode.objects.bulk_create(batch)
+                    loaded += len(batch)
+                    batch = []
+            PostalCode.objects.bulk_create(batch)
+            loaded += len(batch)
+        self.stdout.write('Loaded {} postal codes.'.format(loaded))
+
+        geocoded = 0
+        for profile in Profile.objects.filter(country_id__in=replaced).iterator():
+            profile.geocode()
+            if profile.get_dirty_fields():
+                profile.save(update_fields=['latitude', 'longitude', 'geohash', 'updated_at'])
+                geocoded += 1
+        self.stdout.write('Geocoded {} profiles.'.format(geocoded))
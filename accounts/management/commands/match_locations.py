@@ -0,0 +1,41 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from accounts.locations import MATCH_CUTOFF
+from accounts.models import Profile
+
+
+class Command(BaseCommand):
+    help = ('Maps the free text city and district of every profile to the City '
+            'and District tables of its state with fuzzy matching, and lists '
+            'the most common names that matched nothing.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cutoff', type=float, default=MATCH_CUTOFF,
+                            help='Minimum similarity of fuzzy matches, 0 to 1 (default {}).'.format(MATCH_CUTOFF))
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would change without saving.')
+        parser.add_argument('--unmatched', type=int, default=20,
+                            help='Number of unmatched names to list (default 20).')
+
+    def handle(self, *args, **options):
+        updated = 0
+        unmatched = Counter()
+        for profile in Profile.objects.exclude(state=None).select_related('state').order_by('pk').iterator():
+            profile.match_locations(options['cutoff'])
+            if profile.city.strip() and profile.canonical_city_id is None:
+                unmatched['{} ({})'.format(profile.city.strip(), profile.state)] += 1
+            changed = [name for name in ('canonical_city_id', 'canonical_district_id')
+                       if profile.has_changed(name)]
+            if not changed:
+                continue
+            updated += 1
+            if not options['dry_run']:
+                profile.save(update_fields=changed + ['updated_at'])
+
+        self.stdout.write('{} {} profiles.'.format('Would update' if options['dry_run'] else 'Updated', updated))
+        if unmatched:
+            self.stdout.write('Unmatched cities (state); add them, or their spelling to City.alternate_names:')
+            for name, count in unmatched.most_common(options['unmatched']):
+                self.stdout.write('  {}: {}'.format(name, count))
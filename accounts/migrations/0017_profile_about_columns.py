@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.1 on 2026-10-19 18:16
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+from janani_home.richtext import render_rich_text
+
+
+def fill_about_columns(apps, schema_editor):
+    Profile = apps.get_model('accounts', 'Profile')
+    rows = Profile.objects.exclude(about__isnull=True).exclude(about='').values_list('pk', 'about')
+    for pk, about in rows.iterator():
+        html, text, excerpt = render_rich_text(about)
+        Profile.objects.filter(pk=pk).update(about_html=html, about_text=text, about_excerpt=excerpt)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_profile_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='about_excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='about_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='about_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_about_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.1 on 2026-10-19 18:21
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import smart_selects.db_fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_postal_codes_and_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='City',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('alternate_names', models.CharField(blank=True, help_text='Comma separated other spellings and former names, e.g. "Bangalore".', max_length=500)),
+            ],
+            options={
+                'verbose_name_plural': 'cities',
+                'ordering': ('name',),
+            },
+        ),
+        migrations.CreateModel(
+            name='District',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('state', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='accounts.State')),
+            ],
+            options={
+                'ordering': ('name',),
+            },
+        ),
+        migrations.AddField(
+            model_name='city',
+            name='district',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounts.District'),
+        ),
+        migrations.AddField(
+            model_name='city',
+            name='state',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='accounts.State'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='canonical_city',
+            field=smart_selects.db_fields.ChainedForeignKey(blank=True, chained_field='state', chained_model_field='state', null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounts.City'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='canonical_district',
+            field=smart_selects.db_fields.ChainedForeignKey(blank=True, chained_field='state', chained_model_field='state', null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounts.District'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.1 on 2026-10-19 19:12
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_cities_and_districts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='rich_text_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,18 +1,28 @@
 from django.core.validators import RegexValidator
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.utils import timezone
+from educational_need.aggregates import listing_changed, listing_entry, update_listing_aggregates
+from educational_need import duplicates
 from educational_need.models import EducationalNeed
 from easy_thumbnails.fields import ThumbnailerImageField
 from smart_selects.db_fields import ChainedForeignKey
 from ckeditor.fields import RichTextField
+from janani_home.dirty_fields import DirtyFieldsMixin
+from janani_home.richtext import RichTextColumnsMixin
+from janani_home.query_cache import CachedManager
+from .backends import invalidate_cached_user
+from .geo import encode_geohash, geocode
+from .locations import MATCH_CUTOFF, match_city, match_district
 
 class Country(models.Model):
     name = models.CharField(max_length=200)
     code = models.CharField(max_length=2)
 
+    objects = CachedManager()
+
     def __str__(self):
         return self.name
 
@@ -22,11 +32,69 @@ class State(models.Model):
     code = models.CharField(max_length=3)
     country = models.ForeignKey('Country', null=True)
 
+    objects = CachedManager()
+
+    def __str__(self):
+        return self.name
+
+
+class District(models.Model):
+    name = models.CharField(max_length=200)
+    state = models.ForeignKey('State', on_delete=models.CASCADE)
+
+    objects = CachedManager()
+
+    class Meta:
+        ordering = ('name',)
+
     def __str__(self):
         return self.name
 
 
-class Profile(models.Model):
+class City(models.Model):
+    name = models.CharField(max_length=200)
+    state = models.ForeignKey('State', on_delete=models.CASCADE)
+    district = models.ForeignKey('District', on_delete=models.SET_NULL, null=True, blank=True)
+    alternate_names = models.CharField(
+        max_length=500,
+        blank=True,
+        help_text='Comma separated other spellings and former names, e.g. "Bangalore".')
+
+    objects = CachedManager()
+
+    class Meta:
+        ordering = ('name',)
+        verbose_name_plural = 'cities'
+
+    def __str__(self):
+        return self.name
+
+
+class PostalCode(models.Model):
+    """
+    Offline geocoding table mapping postal codes and places to coordinates,
+    loaded with `manage.py load_postal_codes`.
+    """
+    country = models.ForeignKey(Country, on_delete=models.CASCADE)
+    code = models.CharField(max_length=20, db_index=True)
+    place_name = models.CharField(max_length=200)
+    # Lowercased place_name for city lookups
+    place_key = models.CharField(max_length=200, db_index=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+
+    objects = CachedManager()
+
+    def __str__(self):
+        return '{} {}'.format(self.code, self.place_name)
+
+
+# Columns of a profile that make up its entry in the listing aggregates
+LISTING_FIELDS = ('country_id', 'state_id', 'active_educational_need_id')
+LISTING_UPDATE_FIELDS = frozenset(LISTING_FIELDS + ('country', 'state', 'active_educational_need'))
+
+
+class Profile(RichTextColumnsMixin, DirtyFieldsMixin, models.Model):
     """
     Define model for user profile with one-to-one relationship with User table.
     """
@@ -107,7 +175,40 @@ class Profile(models.Model):
     zip_code = models.CharField(max_length=10, blank=True)
     city = models.CharField(max_length=50, blank=True)
     district = models.CharField(max_length=50, blank=True)
+    # Matched from city and district on save, see accounts.locations
+    canonical_district = ChainedForeignKey(
+        District,
+        on_delete=models.SET_NULL,
+        chained_field="state",
+        chained_model_field="state",
+        show_all=False,
+        auto_choose=False,
+        sort=True,
+        null=True,
+        blank=True
+    )
+    canonical_city = ChainedForeignKey(
+        City,
+        on_delete=models.SET_NULL,
+        chained_field="state",
+        chained_model_field="state",
+        show_all=False,
+        auto_choose=False,
+        sort=True,
+        null=True,
+        blank=True
+    )
+    # Geocoded from zip_code or city on save
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
     about = RichTextField()
+    # Sanitized, plain text and excerpt versions of about, computed on save
+    about_html = models.TextField(blank=True, editable=False)
+    about_text = models.TextField(blank=True, editable=False)
+    about_excerpt = models.CharField(max_length=200, blank=True, editable=False)
+    # janani_home.richtext.SANITIZER_VERSION the columns above were rendered with
+    rich_text_version = models.PositiveSmallIntegerField(default=0, editable=False)
     active_educational_need = models.ForeignKey(
         EducationalNeed,
         on_delete=models.SET_NULL,
@@ -142,10 +243,61 @@ class Profile(models.Model):
         verbose_name='Address')
     additional_contact_details = models.TextField(blank=True, null=True)
     active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    rich_text_fields = ('about',)
+
+    def save(self, *args, **kwargs):
+        if self.pk is None or any(self.has_changed(name) for name in ('zip_code', 'city', 'country_id')):
+            self.geocode()
+        if self.pk is None or any(self.has_changed(name) for name in ('city', 'district', 'state_id')):
+            self.match_locations()
+        update_fields = kwargs.get('update_fields')
+        # Any save without update_fields may write the listing columns, if
+        # not through the dirty field tracking then with whatever values this
+        # instance loaded.
+        saves_listing = update_fields is None or not LISTING_UPDATE_FIELDS.isdisjoint(update_fields)
+        # The listing aggregates are updated by post_save, in the same
+        # transaction, from the row as it is now: the values this instance
+        # loaded may have been changed by a concurrent save since. The lock
+        # makes concurrent saves of the profile take turns.
+        with transaction.atomic():
+            self._listing_before = None
+            if self.pk is not None and saves_listing:
+                self._listing_before = (
+                    Profile.objects.select_for_update().filter(pk=self.pk)
+                    .values_list(*LISTING_FIELDS).first())
+            super().save(*args, **kwargs)
+
+    def geocode(self):
+        """Sets the coordinates from the postal code or city, if known."""
+        place = geocode(self.country_id, self.zip_code, self.city)
+        if place is None:
+            self.latitude = self.longitude = None
+            self.geohash = ''
+        else:
+            self.latitude, self.longitude = place.latitude, place.longitude
+            self.geohash = encode_geohash(place.latitude, place.longitude)
+
+    def match_locations(self, cutoff=MATCH_CUTOFF):
+        """Sets canonical_city and canonical_district from the free text."""
+        self.canonical_city_id = match_city(self.state_id, self.city, cutoff)
+        self.canonical_district_id = match_district(self.state_id, self.district, cutoff)
+        if self.canonical_district_id is None and self.canonical_city_id is not None:
+            self.canonical_district_id = City.objects.filter(
+                pk=self.canonical_city_id).values_list('district_id', flat=True).first()
 
     def get_age(self):
         return timezone.now().year - self.birth_date.year
 
+    def is_complete(self):
+        """
+        Check if the profile has the information required for adding a need.
+        """
+        return all([self.user.first_name, self.user.last_name,
+                    self.user.email, self.birth_date, self.mobile_number,
+                    self.city, self.state_id, self.country_id])
+
     def get_full_name(self):
         if self.middle_name:
             return '{} {} {}'.format(self.user.first_name, self.middle_name, self.user.last_name)
@@ -169,6 +321,64 @@ def create_user_profile(sender, instance, created, **kwargs):
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
     """
-    Update Profile object whenever new User object is updated.
+    Update Profile object whenever new User object is updated. A profile that
+    was never loaded through this user has no changes to save.
     """
-    instance.profile.save()
+    if hasattr(instance, User.profile.related.get_cache_name()):
+        instance.profile.save()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile_user_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_listing(sender, instance, update_fields=None, **kwargs):
+    # Logins only write last_login, which the listing doesn't show
+    if update_fields != frozenset(['last_login']):
+        listing_changed()
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile_listing(sender, instance, **kwargs):
+    listing_changed()
+
+
+@receiver(post_save, sender=Profile)
+def reindex_needs_for_duplicates(sender, instance, created, **kwargs):
+    """The profile's contact numbers are part of its needs' duplicate index."""
+    names = [name.split('__')[-1] for name in duplicates.PROFILE_NUMBER_FIELDS]
+    if not created and any(instance.has_changed(name) for name in names):
+        duplicates.index_after_commit(
+            EducationalNeed.objects.filter(user_id=instance.user_id).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Profile)
+def update_profile_listing_aggregates(sender, instance, created, update_fields=None, **kwargs):
+    """Moves the profile's listed need between the listing aggregates."""
+    before = instance.__dict__.pop('_listing_before', None)
+    if not created and before is None:
+        return
+    after = tuple(getattr(instance, name) for name in LISTING_FIELDS)
+    if before is not None and update_fields is not None:
+        # Columns the save didn't write keep the locked row's values
+        after = tuple(value if name in update_fields or name[:-len('_id')] in update_fields else locked
+                      for name, value, locked in zip(LISTING_FIELDS, after, before))
+    if before == after:
+        return
+    update_listing_aggregates(listing_entry(*before) if before else None, listing_entry(*after))
+
+
+@receiver(post_delete, sender=Profile)
+def remove_profile_listing_aggregates(sender, instance, **kwargs):
+    update_listing_aggregates(listing_entry(*(getattr(instance, name) for name in LISTING_FIELDS)), None)
@@ -0,0 +1,145 @@
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from educational_need.models import EducationalNeed, NeedLocationCount
+
+from . import throttling
+from .models import Country, Profile
+
+THROTTLE_SETTINGS = {
+    'CACHES': dict(settings.CACHES, throttle={
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'login-throttle'}),
+    'LOGIN_THROTTLE_CACHE': 'throttle',
+    'LOGIN_THROTTLE_RATES': {'ip': (6, 60), 'account': (3, 300)},
+    # The login page renders without collectstatic having run
+    'STATICFILES_STORAGE': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+}
+
+
+@override_settings(**THROTTLE_SETTINGS)
+class LoginThrottleTests(TestCase):
+
+    def setUp(self):
+        caches['throttle'].clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user('asha', 'asha@example.com', 'right password')
+
+    def request(self, ip='10.0.0.1'):
+        return self.factory.post('/accounts/login/', REMOTE_ADDR=ip)
+
+    def test_account_scope_runs_out(self):
+        request = self.request()
+        for attempt in range(3):
+            self.assertTrue(throttling.consume(request, 'asha'))
+        self.assertEqual(throttling.throttled_scope(request, 'asha'), 'account')
+        self.assertFalse(throttling.consume(request, 'ASHA '))
+        # Other accounts from the same address still have attempts
+        self.assertIsNone(throttling.throttled_scope(request, 'ravi'))
+        self.assertEqual(throttling.metrics()['throttled_account'], 1)
+
+    def test_refused_attempts_do_not_count(self):
+        request = self.request()
+        for attempt in range(3):
+            throttling.consume(request, 'asha')
+        for attempt in range(5):
+            self.assertFalse(throttling.consume(request, 'asha'))
+        # Only the three counted attempts used up the IP's allowance of six
+        for attempt in range(3):
+            self.assertTrue(throttling.consume(request, 'user{}'.format(attempt)))
+        self.assertEqual(throttling.throttled_scope(request, 'someone'), 'ip')
+
+    def test_ip_scope_runs_out(self):
+        request = self.request()
+        for attempt in range(6):
+            self.assertTrue(throttling.consume(request, 'user{}'.format(attempt)))
+        self.assertEqual(throttling.throttled_scope(request, 'someone'), 'ip')
+        self.assertIsNone(throttling.throttled_scope(self.request('10.0.0.2'), 'someone'))
+
+    def test_window_ends(self):
+        request = self.request()
+        with mock.patch('accounts.throttling.time.time', return_value=1000.0):
+            for attempt in range(3):
+                throttling.consume(request, 'asha')
+            self.assertEqual(throttling.throttled_scope(request, 'asha'), 'account')
+            self.assertEqual(throttling.retry_after(request, 'asha'), 201)
+        with mock.patch('accounts.throttling.time.time', return_value=1200.0):
+            self.assertIsNone(throttling.throttled_scope(request, 'asha'))
+
+    def test_concurrent_attempts_are_all_counted(self):
+        results = []
+
+        def attempt():
+            results.append(throttling.consume(self.request(), 'asha'))
+
+        threads = [threading.Thread(target=attempt) for index in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 3)
+
+    def test_successful_logins_do_not_count(self):
+        request = self.request()
+        for attempt in range(10):
+            self.assertEqual(authenticate(request, username='asha', password='right password'), self.user)
+        self.assertIsNone(throttling.throttled_scope(request, 'asha'))
+
+    def test_failed_logins_are_refused_before_hashing(self):
+        request = self.request()
+        for attempt in range(3):
+            self.assertIsNone(authenticate(request, username='asha', password='wrong'))
+        with mock.patch.object(User, 'check_password') as check_password:
+            # The backend raises PermissionDenied, which stops authenticate()
+            self.assertIsNone(authenticate(request, username='asha', password='right password'))
+        check_password.assert_not_called()
+
+    def test_login_view_answers_429(self):
+        for attempt in range(3):
+            self.client.post(reverse('login'), {'username': 'asha', 'password': 'wrong'})
+        with mock.patch.object(User, 'check_password') as check_password:
+            response = self.client.post(reverse('login'), {'username': 'asha', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(int(response['Retry-After']) > 0)
+        check_password.assert_not_called()
+
+
+class ProfileListingAggregatesTests(TestCase):
+
+    def setUp(self):
+        self.india = Country.objects.create(name='India', code='IN')
+        self.nepal = Country.objects.create(name='Nepal', code='NP')
+        user = User.objects.create_user('asha', 'asha@example.com', 'password')
+        need = EducationalNeed.objects.create(
+            user=user, title='Fees', permanent_address='-', current_address='-',
+            college_school_address='-', college_school_contact_details='-')
+        profile = Profile.objects.get(user=user)
+        profile.country = self.india
+        profile.active_educational_need = need
+        profile.save()
+
+    def counts(self):
+        return dict(NeedLocationCount.objects.filter(count__gt=0).values_list('country_id', 'count'))
+
+    def test_stale_saves_keep_the_counters(self):
+        stale = Profile.objects.get(user__username='asha')
+        profile = Profile.objects.get(user__username='asha')
+        profile.country = self.nepal
+        profile.save()
+        self.assertEqual(self.counts(), {self.nepal.pk: 1})
+
+        # Only about is written
+        stale.about = '<p>About me</p>'
+        stale.save()
+        self.assertEqual(self.counts(), {self.nepal.pk: 1})
+
+        # Everything is written, including the country this copy loaded
+        stale.save(False, False)
+        self.assertEqual(Profile.objects.get(user__username='asha').country_id, self.india.pk)
+        self.assertEqual(self.counts(), {self.india.pk: 1})
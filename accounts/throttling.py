@@ -0,0 +1,155 @@
+"""
+Throttling of failed login attempts per client IP and per account.
+
+Each scope allows a number of attempts per window of time. The attempts of
+the current window are counted in the cache named by LOGIN_THROTTLE_CACHE,
+with cache.add() and cache.incr(), so concurrent workers can't all take the
+last attempt (given a backend where those are atomic, like the Redis or
+database caches required in production). Every login attempt is counted before any password is hashed,
+and given back when the password was right, so only failures use up the
+allowance; a full window means the attempt is refused.
+"""
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'accounts:login-throttle'
+METRICS = ('attempts', 'throttled_ip', 'throttled_account')
+
+
+def _cache():
+    return caches[getattr(settings, 'LOGIN_THROTTLE_CACHE', 'default')]
+
+
+def _rates():
+    # {scope: (attempts, seconds per window)}
+    return getattr(settings, 'LOGIN_THROTTLE_RATES', {
+        'ip': (20, 60),
+        'account': (5, 300),
+    })
+
+
+def client_ip(request):
+    """
+    Returns the client address. Heroku's router appends the address it saw
+    to X-Forwarded-For, so the last entry is the one that can be trusted.
+    """
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if forwarded:
+        return forwarded.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _window(period, now):
+    return int(now // period)
+
+
+def _counter_keys(request, username, now):
+    """Returns {scope: key} of the counters of the current windows."""
+    identities = {'ip': client_ip(request)}
+    if username:
+        identities['account'] = hashlib.md5(username.strip().lower().encode('utf-8')).hexdigest()
+    keys = {}
+    for scope, identity in identities.items():
+        capacity, period = _rates()[scope]
+        keys[scope] = '{}:{}:{}:{}'.format(KEY_PREFIX, scope, identity, _window(period, now))
+    return keys
+
+
+def _record(metric):
+    cache = _cache()
+    key = '{}:metrics:{}'.format(KEY_PREFIX, metric)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def record_lockout(request, scope):
+    _record('throttled_{}'.format(scope))
+    logger.warning('Login throttled by %s bucket for %s', scope, client_ip(request))
+
+
+def throttled_scope(request, username):
+    """
+    Returns the scope ('ip' or 'account') that has no attempts left in its
+    window, or None if an attempt would currently be allowed. Does not count
+    an attempt.
+    """
+    keys = _counter_keys(request, username, time.time())
+    counts = _cache().get_many(keys.values())
+    for scope, key in keys.items():
+        capacity, period = _rates()[scope]
+        if counts.get(key, 0) >= capacity:
+            return scope
+    return None
+
+
+def _increment(key, delta, period):
+    cache = _cache()
+    # The counter expires with its window (plus a margin for clock skew)
+    if delta > 0 and cache.add(key, delta, period * 2):
+        return delta
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Expired in between
+        return 0
+
+
+def consume(request, username):
+    """
+    Counts a login attempt in the IP and account windows. Returns False, and
+    records the lockout, when one of them was already full; a refused attempt
+    is not counted in any window, so an attempt on a locked account doesn't
+    use up the allowance of the IP.
+    """
+    _record('attempts')
+    keys = _counter_keys(request, username, time.time())
+    counts = _cache().get_many(keys.values())
+    for scope, key in keys.items():
+        capacity, period = _rates()[scope]
+        if counts.get(key, 0) >= capacity:
+            record_lockout(request, scope)
+            return False
+    # Concurrent attempts may have filled a window since; incr() tells
+    counted = []
+    for scope, key in keys.items():
+        capacity, period = _rates()[scope]
+        counted.append((key, period))
+        if _increment(key, 1, period) > capacity:
+            for key, period in counted:
+                _increment(key, -1, period)
+            record_lockout(request, scope)
+            return False
+    return True
+
+
+def refund(request, username):
+    """Gives back the attempt of a successful login."""
+    for scope, key in _counter_keys(request, username, time.time()).items():
+        capacity, period = _rates()[scope]
+        _increment(key, -1, period)
+
+
+def retry_after(request, username):
+    """Returns the seconds until the window of the full scope ends."""
+    scope = throttled_scope(request, username)
+    if scope is None:
+        return 0
+    capacity, period = _rates()[scope]
+    now = time.time()
+    return int((_window(period, now) + 1) * period - now) + 1
+
+
+def metrics():
+    """Returns the login attempt and lockout counters."""
+    keys = ['{}:metrics:{}'.format(KEY_PREFIX, metric) for metric in METRICS]
+    values = _cache().get_many(keys)
+    return {metric: values.get(key, 0) for metric, key in zip(METRICS, keys)}
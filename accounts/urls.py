@@ -8,8 +8,9 @@ urlpatterns = [
     url(r'^edit_ngo_profile/$', views.update_ngo_profile, name='update_ngo_profile'),
     url(r'^signup/$', views.signup, name='signup'),
     url(r'^ngo_signup/$', views.organization_signup, name='organization_signup'),
-    url(r'^login/$', auth_views.login, name='login',
+    url(r'^login/$', views.throttled_login, name='login',
         kwargs={'redirect_authenticated_user': True}),
+    url(r'^login/metrics/$', views.login_throttle_metrics, name='login_throttle_metrics'),
     url(r'^logout/$', auth_views.logout, name='logout',
         kwargs={'next_page': 'login'}),
     url(r'^activate/(?P<uidb64>[0-9A-Za-z_\-]+)/(?P<token>[0-9A-Za-z]{1,13}-[0-9A-Za-z]{1,20})/$',
@@ -25,6 +26,8 @@ urlpatterns = [
         auth_views.password_reset_confirm, name='password_reset_confirm'),
     url(r'^reset/done/$', auth_views.password_reset_complete, name='password_reset_complete'),
     url(r'^country/states/$', views.StateAjaxView, name='states_of_country'),
+    url(r'^state/districts/$', views.DistrictAjaxView, name='districts_of_state'),
+    url(r'^state/cities/$', views.CityAjaxView, name='cities_of_state'),
     url(r'^ngo_approval/(?P<pk>\d+)/$', views.ngo_approval, name="ngo_approval"),
     url(r'^(?P<pk>\d+)/ngo_approve/$', views.approve_ngo, name="approve_ngo"),
     url(r'^(?P<pk>\d+)/ngo_reject/$', views.reject_ngo, name="reject_ngo"),
@@ -3,18 +3,22 @@ import json
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import login, update_session_auth_hash
+from django.contrib.auth import views as auth_views
 from django.contrib.auth.models import User
 from django.contrib.sites.shortcuts import get_current_site
 from django.core.mail import EmailMessage
 from django.db import transaction
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.utils.encoding import force_bytes, force_text
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.translation import ugettext_lazy as _
 
-from educational_need.models import EducationalNeed
+from educational_need.aggregates import state_need_counts
+from educational_need.models import EducationalNeed, NeedLocationCount
+from janani_home.conditional import conditional_page
+from janani_home.query_cache import table_versions
 
 from .forms import SignupForm, UserCompletionForm, ProfileCompletionForm
 from .forms import ProfileForm, UserForm, PasswordChangeForm
@@ -23,7 +27,9 @@ from .forms import OrganizationUserForm, OrganizationProfileForm
 
 from .models import Profile
 from .models import State
+from .models import City, District
 
+from . import throttling
 from .tokens import account_activation_token as activation_token
 
 
@@ -32,6 +38,29 @@ def send_email(subject, message, toemails):
     email.send()
 
 
+def throttled_login(request, *args, **kwargs):
+    """
+    Login view that answers with 429 while the client IP or the submitted
+    account is throttled, without running the password hasher.
+    """
+    if request.method == 'POST':
+        username = request.POST.get('username')
+        scope = throttling.throttled_scope(request, username)
+        if scope:
+            throttling.record_lockout(request, scope)
+            response = HttpResponse(
+                'Too many login attempts. Please try again later.',
+                status=429, content_type='text/plain')
+            response['Retry-After'] = throttling.retry_after(request, username)
+            return response
+    return auth_views.login(request, *args, **kwargs)
+
+
+@user_passes_test(lambda u: u.is_superuser)
+def login_throttle_metrics(request):
+    return JsonResponse(throttling.metrics())
+
+
 def signup(request):
     if request.user.is_authenticated():
         return redirect('view_profile')
@@ -249,18 +278,55 @@ def change_password(request):
     })
 
 
+def states_validators(request):
+    # States only change through the admin; any write bumps the table version
+    return (request.GET.get('country_id'), request.GET.get('listed'),
+            table_versions(State, NeedLocationCount)), None
+
+
+@conditional_page(states_validators)
 def StateAjaxView(request):
-    """function to render the states accourding to the city passed"""
+    """function to render the states accourding to the city passed. With
+    listed=1 only states with listed needs are returned, with their count."""
     try:
         country_id = request.GET.get('country_id')
+        states = State.objects.filter(country_id=country_id).values('name', 'id', 'code')
+        if request.GET.get('listed'):
+            counts = state_need_counts(country_id)
+            states = [dict(state, count=counts[state['id']]) for state in states if state['id'] in counts]
         return HttpResponse(
-            json.dumps(tuple(i for i in State.objects.filter(
-                        country_id=country_id).values('name', 'id', 'code'))),
+            json.dumps(tuple(i for i in states)),
             content_type='application/json')
     except Exception as e:
         return HttpResponse(json.dumps([]),content_type='application/json')
 
 
+def districts_validators(request):
+    return (request.GET.get('state_id'), table_versions(District)), None
+
+
+@conditional_page(districts_validators)
+def DistrictAjaxView(request):
+    """Returns the districts of the state passed as JSON."""
+    state_id = request.GET.get('state_id')
+    if not state_id or not state_id.isdigit():
+        return JsonResponse([], safe=False)
+    return JsonResponse(list(District.objects.filter(state_id=state_id).values('name', 'id')), safe=False)
+
+
+def cities_validators(request):
+    return (request.GET.get('state_id'), table_versions(City)), None
+
+
+@conditional_page(cities_validators)
+def CityAjaxView(request):
+    """Returns the cities of the state passed as JSON."""
+    state_id = request.GET.get('state_id')
+    if not state_id or not state_id.isdigit():
+        return JsonResponse([], safe=False)
+    return JsonResponse(list(City.objects.filter(state_id=state_id).values('name', 'id')), safe=False)
+
+
 def organization_signup(request):
     if request.user.is_authenticated():
         return redirect('view_profile')
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.1 on 2026-10-19 18:16
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+from janani_home.richtext import render_rich_text
+
+
+def fill_content_columns(apps, schema_editor):
+    Page = apps.get_model('cms', 'Page')
+    rows = Page.objects.exclude(content__isnull=True).exclude(content='').values_list('pk', 'content')
+    for pk, content in rows.iterator():
+        html, text, excerpt = render_rich_text(content)
+        Page.objects.filter(pk=pk).update(content_html=html, content_text=text, content_excerpt=excerpt)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0004_page_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='content_excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='content_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_content_columns, migrations.RunPython.noop),
+    ]
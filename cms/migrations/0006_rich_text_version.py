@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.1 on 2026-10-19 19:12
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0005_page_content_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='rich_text_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+    ]
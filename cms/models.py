@@ -2,8 +2,11 @@ from ckeditor.fields import RichTextField
 from django.db import models
 from django.utils import timezone
 
+from janani_home.query_cache import CachedManager
+from janani_home.richtext import RichTextColumnsMixin
 
-class Page(models.Model):
+
+class Page(RichTextColumnsMixin, models.Model):
     title = models.CharField(
         max_length=200,
         verbose_name= 'Title',
@@ -31,6 +34,12 @@ class Page(models.Model):
         help_text='Main page content displayed in rich text.',
         blank=True,
         null=True)
+    # Sanitized, plain text and excerpt versions of content, computed on save
+    content_html = models.TextField(blank=True, editable=False)
+    content_text = models.TextField(blank=True, editable=False)
+    content_excerpt = models.CharField(max_length=200, blank=True, editable=False)
+    # janani_home.richtext.SANITIZER_VERSION the columns above were rendered with
+    rich_text_version = models.PositiveSmallIntegerField(default=0, editable=False)
 
     noindex = models.BooleanField(
         default=False,
@@ -54,6 +63,11 @@ class Page(models.Model):
     )
 
     sorting_value = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CachedManager()
+
+    rich_text_fields = ('content',)
 
     def __str__(self):
         return self.title
@@ -1,8 +1,18 @@
+from django.utils.decorators import method_decorator
 from django.views import generic
 
+from janani_home.conditional import conditional_page
 from .models import Page
 
 
+def page_validators(request, slug):
+    updated_at = Page.objects.filter(slug=slug).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    return (updated_at,), updated_at
+
+
+@method_decorator(conditional_page(page_validators), name='dispatch')
 class PageView(generic.DetailView):
     model = Page
     template_name = 'cms/page.html'
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from . models import Comment
+from . models import Comment, CommentStats
 
 
 class CommentAdmin(admin.ModelAdmin):
@@ -11,3 +11,13 @@ class CommentAdmin(admin.ModelAdmin):
         'pub_date',
     )
 admin.site.register(Comment, CommentAdmin)
+
+
+class CommentStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        'app_name',
+        'helper',
+        'count',
+        'average',
+    )
+admin.site.register(CommentStats, CommentStatsAdmin)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.1 on 2026-10-19 17:53
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def build_comment_stats(apps, schema_editor):
+    Comment = apps.get_model('comment', 'Comment')
+    CommentStats = apps.get_model('comment', 'CommentStats')
+    stats = {}
+    for comment in Comment.objects.filter(published=True):
+        key = (comment.app_name or '', comment.helper or '')
+        if key not in stats:
+            stats[key] = CommentStats(app_name=key[0], helper=key[1])
+        row = stats[key]
+        row.count += 1
+        row.rating_total += comment.rating
+        name = 'rating_{}'.format(comment.rating)
+        setattr(row, name, getattr(row, name) + 1)
+    CommentStats.objects.bulk_create(stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comment', '0002_auto_20170907_0014'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('app_name', models.CharField(blank=True, max_length=200)),
+                ('helper', models.CharField(blank=True, max_length=200)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('rating_total', models.PositiveIntegerField(default=0)),
+                ('rating_0', models.PositiveIntegerField(default=0)),
+                ('rating_1', models.PositiveIntegerField(default=0)),
+                ('rating_2', models.PositiveIntegerField(default=0)),
+                ('rating_3', models.PositiveIntegerField(default=0)),
+                ('rating_4', models.PositiveIntegerField(default=0)),
+                ('rating_5', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'comment stats',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['published', '-id'], name='comment_com_publish_02da7d_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='commentstats',
+            unique_together=set([('app_name', 'helper')]),
+        ),
+        migrations.RunPython(build_comment_stats, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,18 @@
-from django.db import models
+import hashlib
+
+from django.db import models, transaction
+from django.db.models import F, Sum
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from janani_home.cache import bump_namespace, get_or_compute, versioned_key
+from janani_home.dirty_fields import DirtyFieldsMixin
+from janani_home.query_cache import CachedManager
+
 
-class Comment(models.Model):
+class Comment(DirtyFieldsMixin, models.Model):
     author = models.ForeignKey('auth.User', related_name='author')
     helper = models.CharField(max_length=200, blank=True, null=True)
     app_name = models.CharField(max_length=200, blank=True)
@@ -12,6 +21,7 @@ class Comment(models.Model):
     pub_date = models.DateField(default=timezone.now)
     rejected = models.BooleanField(default=False)
     rejected_reason = models.CharField(max_length=200, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
     educational_need = models.ForeignKey(
         'educational_need.EducationalNeed',
         on_delete=models.SET_NULL,
@@ -41,5 +51,129 @@ class Comment(models.Model):
         default=3,
     )
 
+    objects = CachedManager()
+
+    class Meta:
+        # Supports the keyset pagination of the public comment wall
+        indexes = [models.Index(fields=['published', '-id'])]
+
     def __str__(self):
         return 'Comment {} ({} on {})'.format(str(self.pk), self.author.username, str(self.pub_date))
+
+
+STATS_NAMESPACE = 'comment:stats'
+# Version of the comment wall, bumped whenever a comment is saved or deleted
+COMMENTS_NAMESPACE = 'comment:list'
+
+
+class CommentStats(models.Model):
+    """
+    Rating statistics of published comments per app_name and helper.
+
+    Rows are maintained incrementally whenever a comment gets published or
+    unpublished, so the comment wall never has to aggregate the comment table.
+    """
+    app_name = models.CharField(max_length=200, blank=True)
+    helper = models.CharField(max_length=200, blank=True)
+    count = models.PositiveIntegerField(default=0)
+    rating_total = models.PositiveIntegerField(default=0)
+    rating_0 = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('app_name', 'helper')
+        verbose_name_plural = 'comment stats'
+
+    def __str__(self):
+        return 'Comment stats ({} / {})'.format(self.app_name, self.helper)
+
+    @property
+    def average(self):
+        if not self.count:
+            return None
+        return self.rating_total / self.count
+
+    def histogram(self):
+        """Return (rating, label, count) tuples ordered from best to worst."""
+        return [(value, label, getattr(self, 'rating_{}'.format(value)))
+                for value, label in reversed(Comment.RATING_CHOICES)]
+
+    @classmethod
+    def record(cls, app_name, helper, rating, delta):
+        """
+        Add (delta=1) or remove (delta=-1) a published comment from the
+        statistics.
+        """
+        stats, created = cls.objects.get_or_create(
+            app_name=app_name or '',
+            helper=helper or '',
+        )
+        cls.objects.filter(pk=stats.pk).update(**{
+            'count': F('count') + delta,
+            'rating_total': F('rating_total') + delta * rating,
+            'rating_{}'.format(rating): F('rating_{}'.format(rating)) + delta,
+        })
+        transaction.on_commit(lambda: bump_namespace(STATS_NAMESPACE))
+
+    @classmethod
+    def summary(cls, **filters):
+        """
+        Combine the statistics rows matching filters into a single unsaved
+        CommentStats object. The sums are cached until record() changes a row,
+        so the comment wall reads one cache key instead of every row.
+        """
+        names = ['count', 'rating_total'] + ['rating_{}'.format(value) for value, label in Comment.RATING_CHOICES]
+
+        def compute():
+            totals = cls.objects.filter(**filters).aggregate(**{name: Sum(name) for name in names})
+            return {name: totals[name] or 0 for name in names}
+
+        digest = hashlib.md5(repr(sorted(filters.items())).encode('utf-8')).hexdigest()
+        totals = get_or_compute(versioned_key(STATS_NAMESPACE, digest), compute, None)
+        return cls(**dict(filters, **totals))
+
+
+# Keep the rating statistics and the cached testimonials in line with the
+# published comments.
+
+STATS_FIELDS = ('published', 'app_name', 'helper', 'rating')
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_stats(sender, instance, created, **kwargs):
+    """
+    Move the comment between the statistics rows whenever it gets published,
+    unpublished or edited while published.
+    """
+    if created:
+        old = (False, None, None, None)
+    else:
+        old = tuple(instance.get_original(name) for name in STATS_FIELDS)
+    new = tuple(getattr(instance, name) for name in STATS_FIELDS)
+    if old == new or not (old[0] or new[0]):
+        return
+    if old[0]:
+        CommentStats.record(*old[1:], delta=-1)
+    if new[0]:
+        CommentStats.record(*new[1:], delta=1)
+    if old[0] != new[0]:
+        from .testimonials import invalidate_testimonials
+        transaction.on_commit(invalidate_testimonials)
+
+
+@receiver(post_delete, sender=Comment)
+def remove_comment_stats(sender, instance, **kwargs):
+    if instance.published:
+        CommentStats.record(instance.app_name, instance.helper, instance.rating, -1)
+        from .testimonials import invalidate_testimonials
+        transaction.on_commit(invalidate_testimonials)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_list(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_namespace(COMMENTS_NAMESPACE))
@@ -0,0 +1,50 @@
+from django.templatetags.static import static
+from easy_thumbnails.files import get_thumbnailer
+
+from janani_home.cache import bump_namespace, get_or_compute, namespace_version, versioned_key
+from .models import Comment
+
+TESTIMONIALS_NAMESPACE = 'comment:testimonials'
+TESTIMONIALS_COUNT = 3
+
+
+def build_testimonials():
+    """
+    Returns the latest published comments as plain dictionaries with the
+    author name, avatar URL and rating already resolved.
+    """
+    comments = Comment.objects.filter(published=True).select_related(
+        'author', 'author__profile').order_by('-pk')[:TESTIMONIALS_COUNT]
+    testimonials = []
+    for comment in comments:
+        profile = comment.author.profile
+        if profile.image:
+            avatar_url = get_thumbnailer(profile.image)['avatar70'].url
+        elif profile.gender == profile.MALE:
+            avatar_url = static('img/avatar-male.jpg')
+        else:
+            avatar_url = static('img/avatar-female.jpg')
+        testimonials.append({
+            'author': comment.author.username,
+            'avatar_url': avatar_url,
+            'has_image': bool(profile.image),
+            'rating': comment.rating,
+            'comment': comment.comment,
+            'pub_date': comment.pub_date,
+        })
+    return testimonials
+
+
+def get_testimonials():
+    """Returns the cached testimonials, building them on a cache miss."""
+    return get_or_compute(versioned_key(TESTIMONIALS_NAMESPACE),
+                          build_testimonials, None)
+
+
+def invalidate_testimonials():
+    bump_namespace(TESTIMONIALS_NAMESPACE)
+
+
+def testimonials_version():
+    """Changes whenever the testimonials do; used to validate cached pages."""
+    return namespace_version(TESTIMONIALS_NAMESPACE)
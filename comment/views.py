@@ -2,19 +2,54 @@ from django.core.mail import EmailMessage
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.sites.shortcuts import get_current_site
+from django.db import transaction
 from django.http import Http404
 from django.shortcuts import render,get_object_or_404 , redirect
 from django.template.loader import render_to_string
 from django.utils import timezone
 
+from educational_need.aggregates import LISTING_NAMESPACE
 from educational_need.models import EducationalNeed
+from janani_home.cache import namespace_versions
+from janani_home.conditional import conditional_page
 from .forms import CommentForm
-from .models import Comment
+from .models import COMMENTS_NAMESPACE, Comment, CommentStats
 
+COMMENTS_PER_PAGE = 10
 
+
+def comment_list_validators(request):
+    """
+    Changes whenever a comment is saved or deleted, or a user or profile
+    (whose names and pictures the wall shows) is saved.
+    """
+    versions = namespace_versions([COMMENTS_NAMESPACE, LISTING_NAMESPACE])
+    return (versions[COMMENTS_NAMESPACE], versions[LISTING_NAMESPACE]), None
+
+
+@conditional_page(comment_list_validators)
 def comment_list(request):
-    comments = Comment.objects.filter(published=True).order_by('-pk')
-    return render(request, 'comment/comment_list.html' , {'comments': comments,})
+    """
+    Returns the published comments, newest first. Pages are addressed with a
+    keyset cursor (?before=<pk>) so that deep pages cost the same as the first.
+    """
+    comments = Comment.objects.filter(published=True).select_related(
+        'author', 'author__profile').order_by('-pk')
+    before = request.GET.get('before')
+    if before and before.isdigit():
+        comments = comments.filter(pk__lt=before)
+    comments = list(comments[:COMMENTS_PER_PAGE + 1])
+    next_cursor = None
+    if len(comments) > COMMENTS_PER_PAGE:
+        comments = comments[:COMMENTS_PER_PAGE]
+        next_cursor = comments[-1].pk
+    context = {
+        'comments': comments,
+        'next_cursor': next_cursor,
+        'is_first_page': not before,
+        'stats': CommentStats.summary(),
+    }
+    return render(request, 'comment/comment_list.html', context)
 
 
 @login_required
@@ -71,8 +106,9 @@ def comment_approval(request, pk):
 
 
 @user_passes_test(lambda u: u.is_superuser)
+@transaction.atomic
 def approve_comment(request, pk):
-    comment = get_object_or_404(Comment, pk=pk)
+    comment = get_object_or_404(Comment.objects.select_for_update(), pk=pk)
     comment.published = True
     comment.rejected = False
     comment.save()
@@ -80,8 +116,9 @@ def approve_comment(request, pk):
 
 
 @user_passes_test(lambda u: u.is_superuser)
+@transaction.atomic
 def reject_comment(request, pk):
-    comment = get_object_or_404(Comment, pk=pk)
+    comment = get_object_or_404(Comment.objects.select_for_update(), pk=pk)
     comment.published = False
     comment.rejected = True
     comment.rejected_reason = 'Rejected by {} on {}.'.format(request.user, timezone.now())
@@ -1,6 +1,9 @@
 from django.contrib import admin
+from django.db.models import Prefetch
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
 
-from .models import EducationalNeed
+from .models import DuplicateFlag, EducationalNeed, ExchangeRate
 
 
 class EducationalNeedAdmin(admin.ModelAdmin):
@@ -13,9 +16,16 @@ class EducationalNeedAdmin(admin.ModelAdmin):
         'amount_required',
         'get_active',
         'closed',
+        'verified',
+        'get_duplicates',
         'pub_date'
     )
 
+    def get_queryset(self, request):
+        flags = DuplicateFlag.objects.filter(dismissed=False)
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('duplicate_flags', queryset=flags), Prefetch('duplicated_by', queryset=flags))
+
     def get_country(self, obj):
         return obj.user.profile.country
     get_country.short_description = 'Country'
@@ -41,4 +51,43 @@ class EducationalNeedAdmin(admin.ModelAdmin):
     get_active.short_description = 'Active'
     get_active.admin_order_field = 'user__profile__active_educational_need__pk'
 
-admin.site.register(EducationalNeed, EducationalNeedAdmin)
\ No newline at end of file
+    def get_duplicates(self, obj):
+        # Flags of both sides of the pair, with links to the other need
+        others = [(flag.duplicate_id, flag) for flag in obj.duplicate_flags.all()]
+        others += [(flag.need_id, flag) for flag in obj.duplicated_by.all()]
+        return format_html_join(', ', '<a href="{}">#{}</a> ({})', (
+            (reverse('admin:educational_need_educationalneed_change', args=[pk]), pk,
+             'same contact' if flag.same_contact else '{:.0%}'.format(flag.similarity))
+            for pk, flag in sorted(others, key=lambda other: other[0])))
+    get_duplicates.short_description = 'Possible duplicates'
+
+admin.site.register(EducationalNeed, EducationalNeedAdmin)
+
+
+class DuplicateFlagAdmin(admin.ModelAdmin):
+    list_display = (
+        'need',
+        'get_duplicate',
+        'similarity',
+        'same_contact',
+        'dismissed',
+        'created_at',
+    )
+    list_editable = ('dismissed',)
+    list_filter = ('dismissed', 'same_contact')
+
+    def get_duplicate(self, obj):
+        return format_html('<a href="{}">{}</a>', reverse(
+            'admin:educational_need_educationalneed_change', args=[obj.duplicate_id]), obj.duplicate)
+    get_duplicate.short_description = 'Possible duplicate of'
+
+admin.site.register(DuplicateFlag, DuplicateFlagAdmin)
+
+
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = (
+        'currency',
+        'rate',
+        'updated_at',
+    )
+admin.site.register(ExchangeRate, ExchangeRateAdmin)
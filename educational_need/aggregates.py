@@ -0,0 +1,189 @@
+"""
+Precomputed aggregates of the listing.
+
+Every listed need (the active need of a profile) has an entry: the country
+and state of its profile and the range its amount falls in. The hooks in
+the accounts and educational_need models pass the entry before and after
+each change to update_listing_aggregates(), which moves the counters of
+AmountHistogram and NeedLocationCount in the same transaction. Changes made with queryset.update()
+bypass the hooks; `manage.py rebuild_listing_aggregates` recomputes
+everything.
+
+The same hooks, and saves of users, bump the listing version, which the
+listing page uses as its ETag instead of scanning the listed needs.
+"""
+from bisect import bisect_right
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+
+from janani_home.cache import bump_namespace, namespace_version
+
+LISTING_NAMESPACE = 'educational_need:listing'
+
+
+def base_currency():
+    return getattr(settings, 'BASE_CURRENCY', 'INR')
+
+
+def _buckets():
+    return getattr(settings, 'AMOUNT_BUCKETS', (0,))
+
+
+def to_base(money):
+    """
+    Returns a Money amount in the base currency, or None when there is no
+    amount or no exchange rate for its currency.
+    """
+    from .models import ExchangeRate
+
+    if money is None:
+        return None
+    if money.currency.code == base_currency():
+        return money.amount
+    rate = ExchangeRate.objects.filter(currency=money.currency.code).values_list('rate', flat=True).first()
+    if rate is None:
+        return None
+    return (money.amount * rate).quantize(Decimal('0.01'))
+
+
+def convert_amounts(currency):
+    """Recomputes amount_base of the needs in a currency, e.g. after its rate changed."""
+    from .models import EducationalNeed
+
+    for need in EducationalNeed.objects.filter(amount_required_currency=currency).exclude(amount_required=None):
+        amount = to_base(need.amount_required)
+        if amount != need.amount_base:
+            need.amount_base = amount
+            need.save(update_fields=['amount_base'])
+
+
+def amount_bucket(amount):
+    """Returns the index of the amount range of a base currency amount."""
+    if amount is None:
+        return None
+    return max(bisect_right(_buckets(), amount) - 1, 0)
+
+
+def bucket_range(bucket):
+    """Returns the (low, high) bounds of an amount range; high is None for the last."""
+    buckets = _buckets()
+    high = buckets[bucket + 1] if bucket + 1 < len(buckets) else None
+    return buckets[bucket], high
+
+
+def amount_buckets(counts=None):
+    """Returns the amount ranges with their labels and counts."""
+    ranges = []
+    for bucket in range(len(_buckets())):
+        low, high = bucket_range(bucket)
+        if not low:
+            label = 'Up to {:,} {}'.format(high, base_currency())
+        elif high is None:
+            label = '{:,} {} or more'.format(low, base_currency())
+        else:
+            label = '{:,} to {:,} {}'.format(low, high, base_currency())
+        ranges.append({'bucket': bucket, 'low': low, 'high': high, 'label': label,
+                       'count': (counts or {}).get(bucket, 0)})
+    return ranges
+
+
+def amount_facets(country_id=None, state_id=None):
+    """Returns the number of listed needs per amount range in a country or state."""
+    from .models import AmountHistogram
+
+    rows = AmountHistogram.objects.filter(count__gt=0)
+    if country_id:
+        rows = rows.filter(country_id=country_id)
+    if state_id:
+        rows = rows.filter(state_id=state_id)
+    return {row['bucket']: row['total'] for row in
+            rows.order_by().values('bucket').annotate(total=Sum('count'))}
+
+
+def country_need_counts():
+    """Returns the number of listed needs per country."""
+    from .models import NeedLocationCount
+
+    return {row['country_id']: row['total'] for row in
+            NeedLocationCount.objects.filter(count__gt=0).order_by().values('country_id')
+            .annotate(total=Sum('count'))}
+
+
+def state_need_counts(country_id):
+    """Returns the number of listed needs per state of a country."""
+    from .models import NeedLocationCount
+
+    return {row['state_id']: row['total'] for row in
+            NeedLocationCount.objects.filter(country_id=country_id, count__gt=0).order_by()
+            .values('state_id').annotate(total=Sum('count'))}
+
+
+def listing_version():
+    """Changes whenever a need, profile or user is saved or deleted."""
+    return namespace_version(LISTING_NAMESPACE)
+
+
+def listing_changed():
+    transaction.on_commit(lambda: bump_namespace(LISTING_NAMESPACE))
+
+
+def listing_entry(country_id, state_id, need_id):
+    """Returns the aggregate entry of a profile's active need, or None."""
+    from .models import EducationalNeed
+
+    if need_id is None:
+        return None
+    amount = EducationalNeed.objects.filter(pk=need_id).values_list('amount_base', flat=True).first()
+    return country_id, state_id, amount_bucket(amount)
+
+
+def _bump(model, delta, **key):
+    if not model.objects.filter(**key).update(count=F('count') + delta):
+        row, created = model.objects.get_or_create(defaults={'count': delta}, **key)
+        if not created:
+            model.objects.filter(pk=row.pk).update(count=F('count') + delta)
+
+
+@transaction.atomic
+def update_listing_aggregates(old, new):
+    """Moves the counters from the entry old to the entry new (either may be None)."""
+    from .models import AmountHistogram, NeedLocationCount
+
+    if old == new:
+        return
+    for entry, delta in ((old, -1), (new, 1)):
+        if entry is None:
+            continue
+        country_id, state_id, bucket = entry
+        if old is None or new is None or old[:2] != new[:2]:
+            _bump(NeedLocationCount, delta, country_id=country_id, state_id=state_id)
+        if bucket is not None:
+            _bump(AmountHistogram, delta, country_id=country_id, state_id=state_id, bucket=bucket)
+
+
+@transaction.atomic
+def rebuild_listing_aggregates():
+    """Recomputes all counters from the profiles and their active needs."""
+    from accounts.models import Profile
+    from .models import AmountHistogram, NeedLocationCount
+
+    histogram = Counter()
+    locations = Counter()
+    listed = Profile.objects.filter(active_educational_need__isnull=False).values_list(
+        'country_id', 'state_id', 'active_educational_need__amount_base')
+    for country_id, state_id, amount in listed.iterator():
+        locations[country_id, state_id] += 1
+        if amount is not None:
+            histogram[country_id, state_id, amount_bucket(amount)] += 1
+    AmountHistogram.objects.all().delete()
+    AmountHistogram.objects.bulk_create(
+        AmountHistogram(country_id=country_id, state_id=state_id, bucket=bucket, count=count)
+        for (country_id, state_id, bucket), count in histogram.items())
+    NeedLocationCount.objects.all().delete()
+    NeedLocationCount.objects.bulk_create(
+        NeedLocationCount(country_id=country_id, state_id=state_id, count=count)
+        for (country_id, state_id), count in locations.items())
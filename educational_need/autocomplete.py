@@ -0,0 +1,245 @@
+"""
+In-memory prefix index for search-as-you-type suggestions.
+
+Each process keeps the names of states, districts and cities and the titles
+of open needs in a sorted array of normalized keys, searched with binary
+search, so a lookup never touches the database. Every word of a name starts
+a key, so "kochi" also finds "Help a student from Kochi". When a prefix
+matches nothing, the variants of the query one typo away are searched too.
+
+The index is built on first use. Saves in this process update it in place.
+Saves in other processes bump a shared version, which is checked every
+CHECK_INTERVAL seconds; the index is rebuilt when they wrote.
+"""
+import threading
+import time
+from bisect import bisect_left
+from urllib.parse import urlencode
+
+from django.db import transaction
+from django.urls import reverse
+
+from accounts.geo import place_key
+from janani_home.cache import bump_namespace, namespace_version
+
+NAMESPACE = 'autocomplete'
+CHECK_INTERVAL = 30
+# Words of a need title that start a key; the rest only extend them
+TITLE_WORDS = 6
+# Kinds in the order suggestions are listed
+KINDS = ('state', 'district', 'city', 'need')
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def _keys(text, words=None):
+    """Returns the keys of a text: the text from each of its words on."""
+    parts = place_key(text).split()
+    return [' '.join(parts[index:]) for index in range(len(parts[:words]))]
+
+
+def _edits(word, positions):
+    """
+    Returns the strings one deletion, transposition, replacement or insertion
+    away, with the edit within the first positions + 1 characters.
+    """
+    splits = [(word[:index], word[index:]) for index in range(min(positions, len(word)) + 1)]
+    edits = set()
+    for left, right in splits:
+        if right:
+            edits.add(left + right[1:])
+            for letter in LETTERS:
+                edits.add(left + letter + right[1:])
+        if len(right) > 1:
+            edits.add(left + right[1] + right[0] + right[2:])
+        for letter in LETTERS:
+            edits.add(left + letter + right)
+    edits.discard(word)
+    return edits
+
+
+class PrefixIndex(object):
+    """Sorted (key, suggestion) arrays of the objects a suggestion can point to."""
+
+    def __init__(self, suggestions=()):
+        self.object_keys = {}
+        pairs = []
+        for suggestion, keys in suggestions:
+            self.object_keys[suggestion[1:3]] = keys
+            pairs.extend((key, suggestion) for key in keys)
+        pairs.sort()
+        self.keys = [key for key, suggestion in pairs]
+        self.suggestions = [suggestion for key, suggestion in pairs]
+        self.version = None
+
+    def add(self, suggestion, keys):
+        self.object_keys[suggestion[1:3]] = keys
+        for key in keys:
+            index = bisect_left(self.keys, key)
+            self.keys.insert(index, key)
+            self.suggestions.insert(index, suggestion)
+
+    def remove(self, kind, pk):
+        """Removes the suggestions of an object."""
+        for key in self.object_keys.pop((kind, pk), ()):
+            index = bisect_left(self.keys, key)
+            while index < len(self.keys) and self.keys[index] == key:
+                if self.suggestions[index][1:3] == (kind, pk):
+                    del self.keys[index]
+                    del self.suggestions[index]
+                    break
+                index += 1
+
+    def _exists(self, prefix):
+        index = bisect_left(self.keys, prefix)
+        return index < len(self.keys) and self.keys[index].startswith(prefix)
+
+    def _prefixed(self, prefix, found, limit):
+        index = bisect_left(self.keys, prefix)
+        # Bounded scan: common prefixes have many keys per suggestion
+        for index in range(index, min(index + limit * 10, len(self.keys))):
+            if not self.keys[index].startswith(prefix):
+                break
+            found.setdefault(self.suggestions[index][1:3], self.suggestions[index])
+
+    def search(self, query, limit=10):
+        """Returns up to limit (label, kind, pk, url) suggestions for a query."""
+        query = place_key(query)
+        if not query:
+            return []
+        found = {}
+        self._prefixed(query, found, limit)
+        if not found and len(query) >= 3:
+            # Edits after the longest prefix that exists can't match anything
+            low, high = 0, len(query)
+            while low < high:
+                middle = (low + high + 1) // 2
+                if self._exists(query[:middle]):
+                    low = middle
+                else:
+                    high = middle - 1
+            for variant in _edits(query, low):
+                self._prefixed(variant, found, limit)
+        ranked = sorted(found.values(), key=lambda suggestion: (
+            KINDS.index(suggestion[1]), len(suggestion[0]), suggestion[0]))
+        return ranked[:limit]
+
+
+def _list_url(**filters):
+    return '{}?{}'.format(reverse('list_view'), urlencode(sorted(filters.items())))
+
+
+def state_suggestion(state):
+    return ((state.name, 'state', state.pk, _list_url(country=state.country_id or '', state=state.pk)),
+            _keys(state.name))
+
+
+def district_suggestion(district, country_id):
+    label = '{}, {}'.format(district.name, district.state.name)
+    url = _list_url(country=country_id or '', state=district.state_id, district=district.pk)
+    return (label, 'district', district.pk, url), _keys(district.name)
+
+
+def city_suggestion(city, country_id):
+    label = '{}, {}'.format(city.name, city.state.name)
+    url = _list_url(country=country_id or '', state=city.state_id, city=city.pk)
+    keys = _keys(city.name)
+    for alias in city.alternate_names.split(','):
+        keys += _keys(alias)
+    return (label, 'city', city.pk, url), keys
+
+
+def need_suggestion(pk, title):
+    return ((title, 'need', pk, reverse('detail_view', kwargs={'pk': pk})),
+            _keys(title, TITLE_WORDS))
+
+
+def build_index():
+    """Reads everything that can be suggested from the database."""
+    from accounts.models import City, District, State
+    from .models import EducationalNeed
+
+    suggestions = []
+    for state in State.objects.all():
+        suggestions.append(state_suggestion(state))
+    for district in District.objects.select_related('state'):
+        suggestions.append(district_suggestion(district, district.state.country_id))
+    for city in City.objects.select_related('state'):
+        suggestions.append(city_suggestion(city, city.state.country_id))
+    for pk, title in EducationalNeed.objects.filter(closed=False).values_list('pk', 'title').iterator():
+        suggestions.append(need_suggestion(pk, title))
+    return PrefixIndex(suggestions)
+
+
+_lock = threading.Lock()
+_index = None
+_checked = 0
+
+
+def get_index():
+    """Returns this process' index, rebuilding it when other processes wrote."""
+    global _index, _checked
+    now = time.time()
+    if _index is not None and now - _checked < CHECK_INTERVAL:
+        return _index
+    with _lock:
+        version = namespace_version(NAMESPACE)
+        if _index is None or _index.version != version:
+            index = build_index()
+            index.version = version
+            _index = index
+        _checked = now
+    return _index
+
+
+def suggest(query, limit=10):
+    return get_index().search(query, limit)
+
+
+def _changed(update):
+    """
+    Applies update to this process' index and bumps the shared version once
+    the transaction commits. When no other process wrote meanwhile, this
+    index is current and keeps the new version.
+    """
+    def on_commit():
+        with _lock:
+            if _index is not None:
+                update(_index)
+            expected = _index.version if _index is not None else None
+            version = bump_namespace(NAMESPACE)
+            if _index is not None and expected is not None and version == expected + 1:
+                _index.version = version
+    transaction.on_commit(on_commit)
+
+
+def index_state(state):
+    def update(index):
+        index.remove('state', state.pk)
+        index.add(*state_suggestion(state))
+    _changed(update)
+
+
+def index_district(district):
+    def update(index):
+        index.remove('district', district.pk)
+        index.add(*district_suggestion(district, district.state.country_id))
+    _changed(update)
+
+
+def index_city(city):
+    def update(index):
+        index.remove('city', city.pk)
+        index.add(*city_suggestion(city, city.state.country_id))
+    _changed(update)
+
+
+def index_need(need):
+    def update(index):
+        index.remove('need', need.pk)
+        if not need.closed:
+            index.add(*need_suggestion(need.pk, need.title))
+    _changed(update)
+
+
+def unindex(kind, pk):
+    _changed(lambda index: index.remove(kind, pk))
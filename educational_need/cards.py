@@ -0,0 +1,54 @@
+import hashlib
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = 'educational_need/result_card.html'
+LITE_CARD_TEMPLATE = 'educational_need/result_card_lite.html'
+CARD_TIMEOUT = 60 * 60 * 24
+# Part of the card keys; bump it when the card templates change
+CARD_VERSION = 2
+# Stands in for the view count in cached cards; user text can't produce it,
+# as it is escaped
+VIEW_COUNT_MARKER = '<!--view-count-->'
+
+
+def card_key(profile, lite=False):
+    """
+    Cache key of the listing card of a profile's active need. It changes
+    whenever the need or the profile row is saved, or the user, state or
+    country names shown on the card change. View counts are updated
+    without saving the need, so they are filled in after the cache.
+    """
+    need = profile.active_educational_need
+    inputs = (need.pk, need.updated_at.timestamp(), profile.updated_at.timestamp(),
+              profile.user.get_username(), str(profile.state), str(profile.country))
+    return 'educational_need:{}:{}:{}:{}'.format(
+        'lite-card' if lite else 'card', CARD_VERSION, need.pk, hashlib.md5(repr(inputs).encode('utf-8')).hexdigest())
+
+
+def render_cards(profiles, lite=False):
+    """
+    Returns the rendered cards of the active needs of profiles, fetching all
+    cached cards in one round trip and rendering only the missing ones.
+    Lite cards are text only. The current view counts replace
+    VIEW_COUNT_MARKER in the cached HTML.
+    """
+    template = LITE_CARD_TEMPLATE if lite else CARD_TEMPLATE
+    keys = [card_key(profile, lite) for profile in profiles]
+    cached = cache.get_many(keys)
+    rendered = {}
+    cards = []
+    for key, profile in zip(keys, profiles):
+        if key not in cached:
+            rendered[key] = render_to_string(template, {
+                'result': profile.active_educational_need,
+                'profile': profile,
+                'view_count': mark_safe(VIEW_COUNT_MARKER),
+            })
+        card = cached.get(key) or rendered[key]
+        cards.append(mark_safe(card.replace(VIEW_COUNT_MARKER, str(profile.active_educational_need.view_count))))
+    if rendered:
+        cache.set_many(rendered, CARD_TIMEOUT)
+    return cards
@@ -0,0 +1,250 @@
+"""
+Detection of needs posted again under other accounts, with light edits.
+
+The title, description, addresses and school details of each need are
+normalized and split into overlapping character shingles, reduced to a
+MinHash signature of NUM_PERM values. The share of equal values of two
+signatures estimates the Jaccard similarity of their shingles.
+
+The signature is cut into BANDS bands, each hashed into a bucket stored in
+NeedBand; needs sharing a bucket are candidates, so a need is only compared
+with the few needs likely to be similar instead of all of them. Needs
+sharing a contact number, their own or their profile's, share a bucket of
+CONTACT_BAND. Candidates of
+other users at least THRESHOLD similar, or with the same contact number,
+are flagged in DuplicateFlag for the moderators.
+
+Needs are indexed after the transaction that creates them or changes their
+text or contact numbers commits; `manage.py find_duplicate_needs` reindexes
+everything.
+"""
+import hashlib
+import logging
+import re
+from collections import defaultdict
+from zlib import crc32
+
+import numpy as np
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+# Estimated Jaccard similarity from which candidates are flagged
+THRESHOLD = 0.5
+SHINGLE_SIZE = 5
+# Buckets shared by more needs than this hold boilerplate, not copies
+MAX_BUCKET_SIZE = 50
+CONTACT_BAND = -1
+
+logger = logging.getLogger(__name__)
+
+_PRIME = (1 << 31) - 1
+_random = np.random.RandomState(20180201)
+_A = _random.randint(1, _PRIME, size=NUM_PERM).astype(np.int64)
+_B = _random.randint(0, _PRIME, size=NUM_PERM).astype(np.int64)
+
+NON_WORD = re.compile(r'[\W_]+')
+NEED_FIELDS = ('pk', 'user_id', 'title', 'requirement_description_text', 'permanent_address',
+               'current_address', 'college_school_address', 'college_school_contact_details',
+               'additional_mobile_number', 'additional_phone_number')
+# Contact numbers of the profile posting the need, read along with NEED_FIELDS
+PROFILE_NUMBER_FIELDS = ('user__profile__mobile_number', 'user__profile__mobile_number_2',
+                         'user__profile__phone_number', 'user__profile__phone_number_2')
+
+
+def normalize(text):
+    return ' '.join(NON_WORD.sub(' ', (text or '').lower()).split())
+
+
+def contact_numbers(*numbers):
+    """Returns the last 10 digits of the numbers that have at least 7."""
+    digits = (re.sub(r'\D', '', number or '') for number in numbers)
+    return sorted({number[-10:] for number in digits if len(number) >= 7})
+
+
+def shingles(text):
+    text = normalize(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[index:index + SHINGLE_SIZE] for index in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingles):
+    """Returns the signature of a set of shingles, or None when it is empty."""
+    if not shingles:
+        return None
+    hashes = np.fromiter((crc32(shingle.encode()) for shingle in shingles), dtype=np.int64,
+                         count=len(shingles)) % _PRIME
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def _bucket(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big', signed=True)
+
+
+def buckets(signature, numbers=()):
+    """Returns the (band, bucket) pairs of a signature and contact numbers."""
+    pairs = []
+    if signature is not None:
+        pairs.extend((band, _bucket(signature[band * ROWS:(band + 1) * ROWS].tobytes()))
+                     for band in range(BANDS))
+    pairs.extend((CONTACT_BAND, _bucket(number.encode())) for number in numbers)
+    return pairs
+
+
+def similarity(signature, other):
+    if signature is None or other is None:
+        return 0.0
+    return float(np.mean(signature == other))
+
+
+def need_signature(values):
+    """Returns the signature and contact numbers of a row of NEED_FIELDS + PROFILE_NUMBER_FIELDS."""
+    # The need's additional mobile and phone numbers, then the profile's
+    count = 2 + len(PROFILE_NUMBER_FIELDS)
+    pk, user_id, title, *texts = values[:-count]
+    return minhash(shingles(' '.join([title] + texts))), contact_numbers(*values[-count:])
+
+
+def _load(data):
+    return np.frombuffer(bytes(data), dtype=np.uint32) if data else None
+
+
+def _flag(pairs, needs=None):
+    """
+    Replaces the flags that weren't dismissed, of needs (all when None), with
+    pairs: {(pk, other pk): (similarity, same contact)}.
+    """
+    from .models import DuplicateFlag
+
+    flags = DuplicateFlag.objects.filter(dismissed=False)
+    if needs is not None:
+        flags = flags.filter(Q(need__in=needs) | Q(duplicate__in=needs))
+    flags.delete()
+    dismissed = DuplicateFlag.objects.all()
+    if needs is not None:
+        dismissed = dismissed.filter(Q(need__in=needs) | Q(duplicate__in=needs))
+    dismissed = set(dismissed.values_list('need_id', 'duplicate_id'))
+    DuplicateFlag.objects.bulk_create(
+        (DuplicateFlag(need_id=need, duplicate_id=duplicate, similarity=score, same_contact=same_contact)
+         # The later need is the suspected copy
+         for (duplicate, need), (score, same_contact) in sorted(pairs.items())
+         if (need, duplicate) not in dismissed),
+        batch_size=1000)
+
+
+def _usable_bucket(size):
+    """Whether the needs of a bucket of size needs, all of them counted, are compared."""
+    return 1 < size < MAX_BUCKET_SIZE
+
+
+def _is_duplicate(score, same_contact):
+    return same_contact or score >= THRESHOLD
+
+
+def index_need(pk):
+    """Stores the signature of a need and flags its duplicates among the indexed needs."""
+    from .models import EducationalNeed, NeedBand, NeedSignature
+
+    values = EducationalNeed.objects.filter(pk=pk).values_list(*NEED_FIELDS + PROFILE_NUMBER_FIELDS).first()
+    if values is None:
+        return
+    user_id = values[1]
+    signature, numbers = need_signature(values)
+    pairs = buckets(signature, numbers)
+    with transaction.atomic():
+        NeedSignature.objects.update_or_create(
+            need_id=pk, defaults={'signature': signature.tobytes() if signature is not None else b''})
+        NeedBand.objects.filter(need_id=pk).delete()
+        NeedBand.objects.bulk_create(NeedBand(need_id=pk, band=band, bucket=bucket) for band, bucket in pairs)
+
+        # Only the members of the buckets small enough to compare are read
+        usable = Q()
+        if pairs:
+            query = Q()
+            for band, bucket in pairs:
+                query |= Q(band=band, bucket=bucket)
+            sizes = NeedBand.objects.filter(query).order_by().values_list('band', 'bucket').annotate(size=Count('pk'))
+            for band, bucket, size in sizes:
+                if _usable_bucket(size):
+                    usable |= Q(band=band, bucket=bucket)
+        candidates = {}
+        if usable:
+            for other, band in NeedBand.objects.filter(usable).exclude(need_id=pk).values_list('need_id', 'band'):
+                candidates[other] = candidates.get(other, False) or band == CONTACT_BAND
+
+        found = {}
+        rows = NeedSignature.objects.filter(need__in=candidates).exclude(need__user_id=user_id).values_list(
+            'need_id', 'signature')
+        for other, data in rows:
+            score = similarity(signature, _load(data))
+            if _is_duplicate(score, candidates[other]):
+                found[tuple(sorted((pk, other)))] = (score, candidates[other])
+        _flag(found, [pk])
+    return len(found)
+
+
+def index_after_commit(pks):
+    """
+    Indexes needs once the current transaction commits. The save has then
+    succeeded, so a failure is logged instead of raised.
+    """
+    pks = list(pks)
+
+    def index():
+        for pk in pks:
+            try:
+                index_need(pk)
+            except Exception:
+                logger.exception('Indexing need %s for duplicates failed', pk)
+
+    transaction.on_commit(index)
+
+
+def find_all_duplicates():
+    """Reindexes every need and recomputes all flags. Returns the number of flagged pairs."""
+    from .models import EducationalNeed, NeedBand, NeedSignature
+
+    pks = []
+    users = []
+    signatures = []
+    members = defaultdict(list)
+    for values in EducationalNeed.objects.order_by('pk').values_list(*NEED_FIELDS + PROFILE_NUMBER_FIELDS).iterator():
+        signature, numbers = need_signature(values)
+        for pair in buckets(signature, numbers):
+            members[pair].append(len(pks))
+        pks.append(values[0])
+        users.append(values[1])
+        signatures.append(signature)
+
+    candidates = {}
+    for (band, bucket), rows in members.items():
+        if _usable_bucket(len(rows)):
+            for first in range(len(rows)):
+                for second in rows[first + 1:]:
+                    key = rows[first], second
+                    candidates[key] = candidates.get(key, False) or band == CONTACT_BAND
+    found = {}
+    for (first, second), same_contact in candidates.items():
+        if users[first] == users[second]:
+            continue
+        score = similarity(signatures[first], signatures[second])
+        if _is_duplicate(score, same_contact):
+            found[pks[first], pks[second]] = (score, same_contact)
+
+    with transaction.atomic():
+        NeedSignature.objects.all().delete()
+        NeedSignature.objects.bulk_create(
+            (NeedSignature(need_id=pk, signature=signature.tobytes() if signature is not None else b'')
+             for pk, signature in zip(pks, signatures)),
+            batch_size=1000)
+        NeedBand.objects.all().delete()
+        NeedBand.objects.bulk_create(
+            (NeedBand(need_id=pks[row], band=band, bucket=bucket)
+             for (band, bucket), rows in members.items() for row in rows),
+            batch_size=1000)
+        _flag(found)
+    return len(found)
@@ -1,6 +1,7 @@
 from django import forms
 
 from .models import EducationalNeed
+from .youtube import parse_playlist_id, parse_video_id
 
 
 class EducationalNeedForm(forms.ModelForm):
@@ -24,6 +25,12 @@ class EducationalNeedForm(forms.ModelForm):
 			'youtube_url',
             'communication_mode',)
 
+    def clean_youtube_url(self):
+        youtube_url = self.cleaned_data.get('youtube_url')
+        if youtube_url and not (parse_video_id(youtube_url) or parse_playlist_id(youtube_url)):
+            raise forms.ValidationError('Please enter the link of a YouTube video or playlist.')
+        return youtube_url
+
 
 class UserContactForm(forms.Form):
     message = forms.CharField(
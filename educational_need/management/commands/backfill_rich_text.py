@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Profile
+from cms.models import Page
+from educational_need.models import EducationalNeed
+from janani_home.richtext import SANITIZER_VERSION, rich_text_columns
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the sanitized HTML, plain text and excerpt columns of '
+            'needs, profiles and pages, e.g. after the sanitizer changed.')
+
+    def handle(self, *args, **options):
+        for model in (EducationalNeed, Profile, Page):
+            # Loading renders rows of an older SANITIZER_VERSION again
+            outdated = model.objects.filter(rich_text_version__lt=SANITIZER_VERSION).count()
+            updated = 0
+            for instance in model.objects.order_by('pk').iterator():
+                columns = {'rich_text_version': SANITIZER_VERSION}
+                for field_name in model.rich_text_fields:
+                    columns.update(rich_text_columns(instance, field_name))
+                changed = [name for name, value in columns.items() if getattr(instance, name) != value]
+                if not changed:
+                    continue
+                for name in changed:
+                    setattr(instance, name, columns[name])
+                # Saving (rather than update()) bumps updated_at, so cached
+                # cards and pages are rendered again
+                instance.save(update_fields=changed + ['updated_at'])
+                updated += 1
+            self.stdout.write('{}: {} updated.'.format(model._meta.verbose_name_plural, outdated + updated))
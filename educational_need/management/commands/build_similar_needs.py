@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from educational_need.similarity import TOP_K, build_similar_needs, update_stale_similar_needs
+
+
+class Command(BaseCommand):
+    help = ('Computes the most similar needs of every open need from TF-IDF vectors '
+            'of their title, description and location. With --stale, only the needs '
+            'created or edited since the last run and the lists they affect.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale', action='store_true',
+                            help='Only update the needs marked stale by their last save.')
+        parser.add_argument('-k', type=int, default=TOP_K,
+                            help='Number of similar needs to store per need (default {}).'.format(TOP_K))
+
+    def handle(self, *args, **options):
+        start = time.time()
+        if options['stale']:
+            count = update_stale_similar_needs(options['k'])
+        else:
+            count = build_similar_needs(options['k'])
+        self.stdout.write('Computed the similar needs of {} needs in {:.1f}s.'.format(count, time.time() - start))
@@ -0,0 +1,92 @@
+import gzip
+import re
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils.text import compress_string
+
+from educational_need.models import EducationalNeed
+
+ASSET_RE = re.compile(r'<(?:script|link|img)\b[^>]*?\b(?:src|href)="([^"]+)"')
+
+
+def _static_path(url):
+    name = url[len(settings.STATIC_URL):].split('?')[0]
+    path = finders.find(name)
+    if path is None and staticfiles_storage.exists(name):
+        path = staticfiles_storage.path(name)
+    return path
+
+
+def _external_weight(url):
+    """Downloads an asset of another host and returns its compressed size."""
+    if url.startswith('//'):
+        url = 'https:' + url
+    try:
+        with urlopen(Request(url, headers={'User-Agent': 'check_page_budget'}), timeout=30) as response:
+            return len(compress_string(response.read()))
+    except (OSError, ValueError) as error:
+        raise CommandError("Can't weigh {}: {}".format(url, error))
+
+
+class Command(BaseCommand):
+    help = ('Renders the lite listing and detail pages and checks that, with '
+            'all the assets they load compressed, they weigh at most LITE_PAGE_BUDGET bytes. '
+            'Assets of other hosts are downloaded to be weighed. Nothing the '
+            'pages write is kept.')
+
+    def handle(self, *args, **options):
+        # Views write (view counts, sessions); roll all of it back
+        with transaction.atomic():
+            try:
+                self.check_pages()
+            finally:
+                transaction.set_rollback(True)
+
+    def check_pages(self):
+        budget = settings.LITE_PAGE_BUDGET
+        pages = [reverse('list_view')]
+        need = EducationalNeed.objects.filter(closed=False).first()
+        if need is not None:
+            pages.append(reverse('detail_view', kwargs={'pk': need.pk}))
+
+        client = Client(HTTP_SAVE_DATA='on', HTTP_ACCEPT_ENCODING='gzip')
+        over_budget = []
+        external_weights = {}
+        # Signed cookie sessions are never written to the cache or database
+        with override_settings(ALLOWED_HOSTS=['testserver'],
+                               SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies'):
+            for url in pages:
+                response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError('{} answered {}'.format(url, response.status_code))
+                if response.get('Content-Encoding') == 'gzip':
+                    html = gzip.decompress(response.content).decode('utf-8')
+                    weight = len(response.content)
+                else:
+                    html = response.content.decode('utf-8')
+                    weight = len(compress_string(response.content))
+                for asset in set(ASSET_RE.findall(html)):
+                    if not asset.startswith(settings.STATIC_URL):
+                        if asset not in external_weights:
+                            external_weights[asset] = _external_weight(asset)
+                        weight += external_weights[asset]
+                        continue
+                    path = _static_path(asset)
+                    if path is None:
+                        raise CommandError('{} references missing {}'.format(url, asset))
+                    with open(path, 'rb') as asset_file:
+                        weight += len(compress_string(asset_file.read()))
+                self.stdout.write('{}: {} bytes of {}'.format(url, weight, budget))
+                if weight > budget:
+                    over_budget.append(url)
+
+        if over_budget:
+            raise CommandError('Over the lite page budget: {}'.format(', '.join(over_budget)))
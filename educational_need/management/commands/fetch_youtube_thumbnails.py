@@ -0,0 +1,35 @@
+import logging
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+
+from educational_need.models import EducationalNeed
+from educational_need.youtube import THUMBNAIL_URL
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('Fetches the preview image of every YouTube video that has none yet '
+            'into media storage, so pages never load images from YouTube.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100,
+                            help='Fetch at most this many thumbnails (default 100).')
+
+    def handle(self, *args, **options):
+        needs = EducationalNeed.objects.exclude(youtube_video_id='').filter(
+            youtube_thumbnail='').order_by('-pk')[:options['limit']]
+        fetched = 0
+        for need in needs:
+            try:
+                with urlopen(THUMBNAIL_URL.format(need.youtube_video_id), timeout=10) as response:
+                    image = response.read()
+            except (URLError, OSError) as e:
+                logger.warning('No thumbnail for %s: %s', need.youtube_video_id, e)
+                continue
+            need.youtube_thumbnail.save('{}.jpg'.format(need.youtube_video_id), ContentFile(image))
+            fetched += 1
+        self.stdout.write('Fetched {} thumbnails.'.format(fetched))
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from educational_need.duplicates import find_all_duplicates
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the MinHash signatures of every need and flags the needs '
+            'that look like copies of a need of another user. New and edited needs '
+            'are checked when they are saved; run this after changing the settings '
+            'in educational_need.duplicates or importing needs.')
+
+    def handle(self, *args, **options):
+        start = time.time()
+        count = find_all_duplicates()
+        self.stdout.write('Flagged {} possible duplicates in {:.1f}s.'.format(count, time.time() - start))
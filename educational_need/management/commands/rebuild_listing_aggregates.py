@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from educational_need.aggregates import rebuild_listing_aggregates, to_base
+from educational_need.models import EducationalNeed
+
+
+class Command(BaseCommand):
+    help = ('Converts every amount to the base currency with the current exchange '
+            'rates and recomputes the listing aggregates from scratch.')
+
+    def handle(self, *args, **options):
+        converted = 0
+        with transaction.atomic():
+            for need in EducationalNeed.objects.exclude(amount_required=None).iterator():
+                amount = to_base(need.amount_required)
+                if amount != need.amount_base:
+                    EducationalNeed.objects.filter(pk=need.pk).update(amount_base=amount)
+                    converted += 1
+            rebuild_listing_aggregates()
+        self.stdout.write('Converted {} amounts and rebuilt the listing aggregates.'.format(converted))
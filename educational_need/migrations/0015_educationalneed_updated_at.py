@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.1 on 2026-10-19 18:00
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('educational_need', '0014_educationalneed_verified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='educationalneed',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
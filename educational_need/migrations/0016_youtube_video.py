@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.1 on 2026-10-19 18:13
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+from educational_need.youtube import parse_video_id
+
+
+def parse_video_ids(apps, schema_editor):
+    EducationalNeed = apps.get_model('educational_need', 'EducationalNeed')
+    needs = EducationalNeed.objects.exclude(youtube_url__isnull=True).exclude(youtube_url='')
+    for pk, youtube_url in needs.values_list('pk', 'youtube_url'):
+        video_id = parse_video_id(youtube_url)
+        if video_id:
+            EducationalNeed.objects.filter(pk=pk).update(youtube_video_id=video_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('educational_need', '0015_educationalneed_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='educationalneed',
+            name='youtube_thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='youtube'),
+        ),
+        migrations.AddField(
+            model_name='educationalneed',
+            name='youtube_video_id',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.RunPython(parse_video_ids, migrations.RunPython.noop),
+    ]
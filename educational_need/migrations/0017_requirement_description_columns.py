@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.1 on 2026-10-19 18:16
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+from janani_home.richtext import render_rich_text
+
+
+def fill_requirement_description_columns(apps, schema_editor):
+    EducationalNeed = apps.get_model('educational_need', 'EducationalNeed')
+    rows = EducationalNeed.objects.exclude(requirement_description__isnull=True).exclude(requirement_description='').values_list('pk', 'requirement_description')
+    for pk, requirement_description in rows.iterator():
+        html, text, excerpt = render_rich_text(requirement_description)
+        EducationalNeed.objects.filter(pk=pk).update(requirement_description_html=html, requirement_description_text=text, requirement_description_excerpt=excerpt)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('educational_need', '0016_youtube_video'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='educationalneed',
+            name='requirement_description_excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='educationalneed',
+            name='requirement_description_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='educationalneed',
+            name='requirement_description_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_requirement_description_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.1 on 2026-10-19 18:24
+from __future__ import unicode_literals
+
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+import django.db.models.deletion
+
+from educational_need.aggregates import amount_bucket
+
+
+def backfill_amounts(apps, schema_editor):
+    EducationalNeed = apps.get_model('educational_need', 'EducationalNeed')
+    Profile = apps.get_model('accounts', 'Profile')
+    AmountHistogram = apps.get_model('educational_need', 'AmountHistogram')
+    # There are no exchange rates yet, so only base currency amounts convert;
+    # adding a rate in the admin converts the needs in its currency
+    (EducationalNeed.objects
+     .filter(amount_required_currency=getattr(settings, 'BASE_CURRENCY', 'INR'))
+     .exclude(amount_required=None)
+     .update(amount_base=F('amount_required')))
+    histogram = Counter()
+    listed = Profile.objects.filter(active_educational_need__amount_base__isnull=False).values_list(
+        'country_id', 'state_id', 'active_educational_need__amount_base')
+    for country_id, state_id, amount in listed.iterator():
+        histogram[country_id, state_id, amount_bucket(amount)] += 1
+    AmountHistogram.objects.bulk_create(
+        AmountHistogram(country_id=country_id, state_id=state_id, bucket=bucket, count=count)
+        for (country_id, state_id, bucket), count in histogram.items())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_cities_and_districts'),
+        ('educational_need', '0017_requirement_description_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AmountHistogram',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('country', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='accounts.Country')),
+                ('state', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='accounts.State')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3, unique=True)),
+                ('rate', models.DecimalField(decimal_places=8, help_text='Value of one unit of the currency in the base currency.', max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='educationalneed',
+            name='amount_base',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='amounthistogram',
+            unique_together=set([('country', 'state', 'bucket')]),
+        ),
+        migrations.RunPython(backfill_amounts, migrations.RunPython.noop),
+    ]
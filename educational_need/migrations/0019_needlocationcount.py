@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.1 on 2026-10-19 18:26
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def count_listed_needs(apps, schema_editor):
+    Profile = apps.get_model('accounts', 'Profile')
+    NeedLocationCount = apps.get_model('educational_need', 'NeedLocationCount')
+    listed = (Profile.objects.filter(active_educational_need__isnull=False).order_by()
+              .values('country_id', 'state_id').annotate(count=Count('pk')))
+    NeedLocationCount.objects.bulk_create(
+        NeedLocationCount(country_id=row['country_id'], state_id=row['state_id'], count=row['count'])
+        for row in listed)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_cities_and_districts'),
+        ('educational_need', '0018_amount_base_and_histogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NeedLocationCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('country', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='accounts.Country')),
+                ('state', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='accounts.State')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='needlocationcount',
+            unique_together=set([('country', 'state')]),
+        ),
+        migrations.RunPython(count_listed_needs, migrations.RunPython.noop),
+    ]
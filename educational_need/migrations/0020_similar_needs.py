@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.1 on 2026-10-19 18:36
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('educational_need', '0019_needlocationcount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarNeed',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ('need', 'rank'),
+            },
+        ),
+        migrations.AddField(
+            model_name='educationalneed',
+            name='similar_needs_stale',
+            field=models.BooleanField(db_index=True, default=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='similarneed',
+            name='need',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_needs', to='educational_need.EducationalNeed'),
+        ),
+        migrations.AddField(
+            model_name='similarneed',
+            name='similar',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='educational_need.EducationalNeed'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='similarneed',
+            unique_together=set([('need', 'rank')]),
+        ),
+    ]
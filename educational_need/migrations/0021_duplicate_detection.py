@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.1 on 2026-10-19 18:39
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('educational_need', '0020_similar_needs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateFlag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('similarity', models.FloatField()),
+                ('same_contact', models.BooleanField(default=False)),
+                ('dismissed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ('-created_at',),
+            },
+        ),
+        migrations.CreateModel(
+            name='NeedBand',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.SmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NeedSignature',
+            fields=[
+                ('need', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='educational_need.EducationalNeed')),
+                ('signature', models.BinaryField(blank=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='needband',
+            name='need',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='educational_need.EducationalNeed'),
+        ),
+        migrations.AddField(
+            model_name='duplicateflag',
+            name='duplicate',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicated_by', to='educational_need.EducationalNeed', verbose_name='possible duplicate of'),
+        ),
+        migrations.AddField(
+            model_name='duplicateflag',
+            name='need',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_flags', to='educational_need.EducationalNeed'),
+        ),
+        migrations.AlterIndexTogether(
+            name='needband',
+            index_together=set([('band', 'bucket')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='duplicateflag',
+            unique_together=set([('need', 'duplicate')]),
+        ),
+    ]
@@ -1,14 +1,23 @@
 import uuid
 
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from django.utils import timezone
 
 from djmoney.models.fields import MoneyField
 from ckeditor.fields import RichTextField
 
+from janani_home.dirty_fields import DirtyFieldsMixin
+from janani_home.query_cache import CachedManager
+from janani_home.richtext import RichTextColumnsMixin
+from . import autocomplete, duplicates
+from .aggregates import amount_bucket, convert_amounts, listing_changed, to_base, update_listing_aggregates
+from .youtube import embed_url, parse_playlist_id, parse_video_id
 
-class EducationalNeed(models.Model):
+
+class EducationalNeed(RichTextColumnsMixin, DirtyFieldsMixin, models.Model):
 
     uuid = models.UUIDField(default=uuid.uuid4, editable=False)
     date_uuid = models.CharField(max_length=100, blank=True, null=True)
@@ -46,8 +55,23 @@ class EducationalNeed(models.Model):
         blank=True,
         null=True
     )
+    # amount_required in settings.BASE_CURRENCY, for filtering; None when
+    # there is no exchange rate for the currency
+    amount_base = models.DecimalField(
+        max_digits=14, decimal_places=2, null=True, blank=True, db_index=True, editable=False)
     requirement_description = RichTextField()
+    # Sanitized, plain text and excerpt versions of requirement_description,
+    # computed on save
+    requirement_description_html = models.TextField(blank=True, editable=False)
+    requirement_description_text = models.TextField(blank=True, editable=False)
+    requirement_description_excerpt = models.CharField(max_length=200, blank=True, editable=False)
+    # janani_home.richtext.SANITIZER_VERSION the columns above were rendered with
+    rich_text_version = models.PositiveSmallIntegerField(default=0, editable=False)
     youtube_url = models.URLField(blank=True, null=True)
+    # Parsed from youtube_url on save; the thumbnail is fetched into our own
+    # storage by `manage.py fetch_youtube_thumbnails`
+    youtube_video_id = models.CharField(max_length=20, blank=True, editable=False)
+    youtube_thumbnail = models.ImageField(upload_to='youtube', blank=True, editable=False)
     closed = models.BooleanField(default=False)
 
     # Define choices for communication_mode field
@@ -67,6 +91,11 @@ class EducationalNeed(models.Model):
     )
 
     verified = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Set when the similar needs must be recomputed, see educational_need.similarity
+    similar_needs_stale = models.BooleanField(default=True, editable=False, db_index=True)
+
+    rich_text_fields = ('requirement_description',)
 
     def __str__(self):
         return 'Educational Need {}'.format(str(self.pk))
@@ -74,7 +103,218 @@ class EducationalNeed(models.Model):
     def save(self, *args, **kwargs):
         if not self.date_uuid:
             self.date_uuid = self.pub_date.strftime('%Y/%m/%d/') + str(self.uuid)
-        super().save(*args, **kwargs)
+        video_id = parse_video_id(self.youtube_url) or ''
+        old_thumbnail = None
+        if video_id != self.youtube_video_id:
+            self.youtube_video_id = video_id
+            old_thumbnail = self.youtube_thumbnail.name or None
+            self.youtube_thumbnail = ''
+        if (self.pk is None or self.has_changed('amount_required') or
+                self.has_changed('amount_required_currency') or
+                (self.amount_required is not None and self.amount_base is None)):
+            self.amount_base = to_base(self.amount_required)
+        # The listing aggregates are updated by post_save, in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if old_thumbnail:
+                # Only once the row no longer points to it
+                storage = self.youtube_thumbnail.storage
+                transaction.on_commit(lambda: storage.delete(old_thumbnail))
 
     def create_youtube_embed_link(self):
-        return str(self.youtube_url).replace('watch?v=', 'embed/')
+        return embed_url(self.youtube_video_id, parse_playlist_id(self.youtube_url))
+
+
+class SimilarNeed(models.Model):
+    """
+    One of the needs most similar to a need, computed by
+    educational_need.similarity.
+    """
+    need = models.ForeignKey(EducationalNeed, on_delete=models.CASCADE, related_name='similar_needs')
+    similar = models.ForeignKey(EducationalNeed, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ('need', 'rank')
+        unique_together = ('need', 'rank')
+
+    def __str__(self):
+        return '{} -> {} ({:.2f})'.format(self.need_id, self.similar_id, self.score)
+
+
+class NeedSignature(models.Model):
+    """MinHash signature of a need, see educational_need.duplicates."""
+    need = models.OneToOneField(EducationalNeed, on_delete=models.CASCADE, primary_key=True,
+                                related_name='signature')
+    signature = models.BinaryField(blank=True)
+
+
+class NeedBand(models.Model):
+    """Locality-sensitive hash bucket of a band of a need's signature."""
+    need = models.ForeignKey(EducationalNeed, on_delete=models.CASCADE, related_name='+')
+    band = models.SmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        index_together = ('band', 'bucket')
+
+
+class DuplicateFlag(models.Model):
+    """
+    A need that looks like a copy of an earlier need of another user, found
+    by educational_need.duplicates. Dismissed flags aren't raised again.
+    """
+    need = models.ForeignKey(EducationalNeed, on_delete=models.CASCADE, related_name='duplicate_flags')
+    duplicate = models.ForeignKey(EducationalNeed, on_delete=models.CASCADE, related_name='duplicated_by',
+                                  verbose_name='possible duplicate of')
+    similarity = models.FloatField()
+    same_contact = models.BooleanField(default=False)
+    dismissed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('-created_at',)
+        unique_together = ('need', 'duplicate')
+
+    def __str__(self):
+        return '{} / {} ({:.0%})'.format(self.need_id, self.duplicate_id, self.similarity)
+
+
+class ExchangeRate(models.Model):
+    """Rate of a currency to settings.BASE_CURRENCY, maintained in the admin."""
+    currency = models.CharField(max_length=3, unique=True)
+    rate = models.DecimalField(
+        max_digits=18,
+        decimal_places=8,
+        help_text='Value of one unit of the currency in the base currency.')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CachedManager()
+
+    def __str__(self):
+        return '{} {}'.format(self.currency, self.rate)
+
+
+class AmountHistogram(models.Model):
+    """
+    Number of listed needs per amount range (see AMOUNT_BUCKETS) in each
+    country and state, maintained by educational_need.aggregates.
+    """
+    country = models.ForeignKey('accounts.Country', on_delete=models.CASCADE, null=True)
+    state = models.ForeignKey('accounts.State', on_delete=models.CASCADE, null=True)
+    bucket = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    objects = CachedManager()
+
+    class Meta:
+        unique_together = ('country', 'state', 'bucket')
+
+
+class NeedLocationCount(models.Model):
+    """
+    Number of listed needs in each country and state, maintained by
+    educational_need.aggregates.
+    """
+    country = models.ForeignKey('accounts.Country', on_delete=models.CASCADE, null=True)
+    state = models.ForeignKey('accounts.State', on_delete=models.CASCADE, null=True)
+    count = models.IntegerField(default=0)
+
+    objects = CachedManager()
+
+    class Meta:
+        unique_together = ('country', 'state')
+
+
+@receiver(post_save, sender=EducationalNeed)
+def update_amount_aggregates(sender, instance, created, **kwargs):
+    """Moves the profiles listing this need to its new amount range."""
+    if created or not instance.has_changed('amount_base'):
+        return
+    old_bucket = amount_bucket(instance.get_original('amount_base'))
+    new_bucket = amount_bucket(instance.amount_base)
+    for country_id, state_id in instance.profile_set.values_list('country_id', 'state_id'):
+        update_listing_aggregates((country_id, state_id, old_bucket), (country_id, state_id, new_bucket))
+
+
+@receiver(post_save, sender=EducationalNeed)
+@receiver(post_delete, sender=EducationalNeed)
+def invalidate_need_listing(sender, instance, **kwargs):
+    listing_changed()
+
+
+@receiver(pre_delete, sender=EducationalNeed)
+def remember_listing_profiles(sender, instance, **kwargs):
+    instance._listing_profiles = list(instance.profile_set.values_list('pk', 'country_id', 'state_id'))
+
+
+@receiver(post_delete, sender=EducationalNeed)
+def remove_deleted_need_aggregates(sender, instance, **kwargs):
+    """
+    Takes the need out of the aggregates of the profiles that listed it and
+    still exist; profiles deleted along with it have removed it themselves.
+    """
+    from accounts.models import Profile
+
+    listing = getattr(instance, '_listing_profiles', [])
+    remaining = set(Profile.objects.filter(pk__in=[pk for pk, country_id, state_id in listing])
+                    .values_list('pk', flat=True))
+    for pk, country_id, state_id in listing:
+        if pk in remaining:
+            update_listing_aggregates((country_id, state_id, amount_bucket(instance.amount_base)), None)
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def convert_needs_to_new_rate(sender, instance, **kwargs):
+    convert_amounts(instance.currency)
+
+
+@receiver(post_save, sender=EducationalNeed)
+def index_need_title(sender, instance, created, **kwargs):
+    # Only titles and closing matter here
+    if created or instance.has_changed('title') or instance.has_changed('closed'):
+        autocomplete.index_need(instance)
+
+
+@receiver(post_save, sender=EducationalNeed)
+def mark_similar_needs_stale(sender, instance, created, **kwargs):
+    # The flag is cleared with queryset.update(), so the instance's copy may be outdated
+    if not created and any(instance.has_changed(name) for name in ('title', 'requirement_description', 'closed')):
+        EducationalNeed.objects.filter(pk=instance.pk).update(similar_needs_stale=True)
+
+
+@receiver(post_save, sender=EducationalNeed)
+def find_need_duplicates(sender, instance, created, **kwargs):
+    # NEED_FIELDS after the pk are the ones the signature is computed from
+    if created or any(instance.has_changed(name) for name in duplicates.NEED_FIELDS[1:]):
+        duplicates.index_after_commit([instance.pk])
+
+
+@receiver(post_delete, sender=EducationalNeed)
+def unindex_need_title(sender, instance, **kwargs):
+    autocomplete.unindex('need', instance.pk)
+
+
+@receiver(post_save, sender='accounts.State')
+def index_state_name(sender, instance, **kwargs):
+    autocomplete.index_state(instance)
+
+
+@receiver(post_save, sender='accounts.District')
+def index_district_name(sender, instance, **kwargs):
+    autocomplete.index_district(instance)
+
+
+@receiver(post_save, sender='accounts.City')
+def index_city_name(sender, instance, **kwargs):
+    autocomplete.index_city(instance)
+
+
+@receiver(post_delete, sender='accounts.State')
+@receiver(post_delete, sender='accounts.District')
+@receiver(post_delete, sender='accounts.City')
+def unindex_location_name(sender, instance, **kwargs):
+    autocomplete.unindex(sender._meta.model_name, instance.pk)
@@ -0,0 +1,219 @@
+"""
+Similar needs, from TF-IDF vectors of their title, description and location.
+
+`manage.py build_similar_needs` vectorizes the open needs into a sparse
+matrix with one L2 normalized row per need, multiplies blocks of its rows
+with its transpose to get their cosine similarities, and stores the TOP_K
+most similar needs of each need in SimilarNeed, which the detail page reads.
+
+Saving a need with a new title or description, or closing or reopening it,
+marks it stale. `manage.py build_similar_needs --stale` recomputes only the
+stale needs and the needs whose lists they enter or leave.
+"""
+import re
+from array import array
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from accounts.geo import place_key
+
+TOP_K = 5
+# Rows multiplied at a time; bounds the memory of a block of similarities
+BLOCK_SIZE = 500
+# Words in more than this share of the needs match nearly every need and are
+# dropped, which also keeps the similarity blocks sparse
+MAX_DOCUMENT_FREQUENCY = 0.05
+# Below this many needs every word is kept
+MIN_NEEDS_FOR_PRUNING = 200
+TITLE_WEIGHT = 2
+# Needs whose stale flag is cleared per UPDATE
+CLEAR_BATCH_SIZE = 500
+
+STOP_WORDS = frozenset("""
+    a about after all also am an and any are as at be because been but by can
+    could did do does for from had has have he her him his how i if in into is
+    it its me more my no not of on or our she so some than that the their them
+    then there these they this to up us very was we were what when which who
+    will with would you your
+""".split())
+WORD = re.compile(r'[^\W\d_]{2,}')
+
+
+def tokens(text):
+    return [word for word in WORD.findall((text or '').lower()) if word not in STOP_WORDS]
+
+
+def need_document(title, description, *places):
+    """
+    Returns the terms of a need: the words of its title, counted
+    TITLE_WEIGHT times, and description, and one term per place name.
+    """
+    terms = tokens(title) * TITLE_WEIGHT + tokens(description)
+    terms.extend('place:' + place_key(place) for place in places if place_key(place))
+    return terms
+
+
+def tfidf_matrix(documents):
+    """Returns the L2 normalized TF-IDF matrix (CSR, one row per document) of term lists."""
+    vocabulary = {}
+    indptr = array('i', [0])
+    indices = array('i')
+    counts = array('f')
+    for terms in documents:
+        for term, count in Counter(terms).items():
+            indices.append(vocabulary.setdefault(term, len(vocabulary)))
+            counts.append(count)
+        indptr.append(len(indices))
+    size = len(indptr) - 1
+    matrix = sparse.csr_matrix(
+        (np.frombuffer(counts, dtype=np.float32), np.frombuffer(indices, dtype=np.int32),
+         np.frombuffer(indptr, dtype=np.int32)),
+        shape=(size, max(len(vocabulary), 1)), copy=True)
+    frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    idf = (np.log((1.0 + size) / (1.0 + frequency)) + 1).astype(np.float32)
+    if size >= MIN_NEEDS_FOR_PRUNING:
+        idf[frequency > MAX_DOCUMENT_FREQUENCY * size] = 0
+    # Sublinear term frequency: a word repeated ten times isn't ten times as relevant
+    matrix.data = (1 + np.log(matrix.data)) * idf[matrix.indices]
+    norms = np.sqrt(np.bincount(np.repeat(np.arange(size), np.diff(matrix.indptr)),
+                                weights=matrix.data ** 2, minlength=size)).astype(np.float32)
+    norms[norms == 0] = 1
+    matrix.data /= np.repeat(norms, np.diff(matrix.indptr))
+    matrix.eliminate_zeros()
+    return matrix
+
+
+def top_neighbours(matrix, rows, k=TOP_K):
+    """
+    Yields (row, [(other row, score), ...]) with the k rows of matrix most
+    similar to each of rows, best first.
+    """
+    transposed = matrix.T.tocsr()
+    for start in range(0, len(rows), BLOCK_SIZE):
+        block = rows[start:start + BLOCK_SIZE]
+        scores = matrix[block].dot(transposed).tocsr()
+        for offset, row in enumerate(block):
+            low, high = scores.indptr[offset], scores.indptr[offset + 1]
+            columns, values = scores.indices[low:high], scores.data[low:high]
+            keep = (columns != row) & (values > 0)
+            columns, values = columns[keep], values[keep]
+            if len(values) > k:
+                best = np.argpartition(-values, k)[:k]
+                columns, values = columns[best], values[best]
+            order = np.argsort(-values, kind='mergesort')
+            yield row, list(zip(columns[order].tolist(), values[order].tolist()))
+
+
+def open_need_documents():
+    """
+    Returns the pks and term lists of the open needs, and the updated_at of
+    each need as it was read.
+    """
+    from .models import EducationalNeed
+
+    pks = []
+    documents = []
+    versions = {}
+    rows = EducationalNeed.objects.filter(closed=False).order_by('pk').values_list(
+        'pk', 'updated_at', 'title', 'requirement_description_text', 'user__profile__canonical_city__name',
+        'user__profile__city', 'user__profile__canonical_district__name', 'user__profile__district',
+        'user__profile__state__name')
+    for pk, updated_at, title, description, city, city_text, district, district_text, state in rows.iterator():
+        pks.append(pk)
+        documents.append(need_document(title, description, city or city_text, district or district_text, state))
+        versions[pk] = updated_at
+    return pks, documents, versions
+
+
+def _clear_stale(needs, versions):
+    """
+    Clears the stale flag of the needs not saved since versions were read,
+    with conditional updates rather than row locks. A need edited meanwhile
+    keeps its flag, so the next run picks up the edit.
+    """
+    from .models import EducationalNeed
+
+    needs = [pk for pk in needs if pk in versions]
+    for start in range(0, len(needs), CLEAR_BATCH_SIZE):
+        unchanged = Q()
+        for pk in needs[start:start + CLEAR_BATCH_SIZE]:
+            unchanged |= Q(pk=pk, updated_at=versions[pk])
+        EducationalNeed.objects.filter(unchanged).update(similar_needs_stale=False)
+
+
+def _store(pks, neighbours, needs, versions):
+    """
+    Replaces the stored lists of needs with neighbours, in rows of the matrix,
+    and clears the stale flag of the needs not saved since versions were read.
+    """
+    from .models import SimilarNeed
+
+    now = timezone.now()
+    with transaction.atomic():
+        SimilarNeed.objects.filter(need__in=needs).delete()
+        SimilarNeed.objects.bulk_create(
+            (SimilarNeed(need_id=pks[row], similar_id=pks[column], score=score, rank=rank, computed_at=now)
+             for row, similar in neighbours for rank, (column, score) in enumerate(similar)),
+            batch_size=1000)
+        _clear_stale(needs, versions)
+
+
+def build_similar_needs(k=TOP_K):
+    """
+    Recomputes the similar needs of every open need. Returns the number of
+    needs. Each block of needs is stored in its own transaction, so the
+    detail pages keep reading the previous lists of the other needs meanwhile.
+    """
+    from .models import EducationalNeed, SimilarNeed
+
+    pks, documents, versions = open_need_documents()
+    matrix = tfidf_matrix(documents)
+    rows = list(range(len(pks)))
+    for start in range(0, len(rows), BLOCK_SIZE * 10):
+        block = rows[start:start + BLOCK_SIZE * 10]
+        _store(pks, top_neighbours(matrix, block, k), [pks[row] for row in block], versions)
+    # In this order, a need closed in between keeps its flag
+    EducationalNeed.objects.filter(closed=True, similar_needs_stale=True).update(similar_needs_stale=False)
+    SimilarNeed.objects.filter(need__closed=True).delete()
+    return len(pks)
+
+
+def update_stale_similar_needs(k=TOP_K):
+    """
+    Recomputes the similar needs of the stale needs, and of the needs that
+    listed one of them or that one of them is now more similar to than the
+    last of their list. Returns the number of needs recomputed.
+    """
+    from .models import EducationalNeed, SimilarNeed
+
+    versions = dict(EducationalNeed.objects.filter(similar_needs_stale=True).values_list('pk', 'updated_at'))
+    stale = set(versions)
+    if not stale:
+        return 0
+    pks, documents, open_versions = open_need_documents()
+    versions.update(open_versions)
+    matrix = tfidf_matrix(documents)
+    row_of = {pk: row for row, pk in enumerate(pks)}
+
+    affected = set(stale)
+    affected.update(SimilarNeed.objects.filter(similar__in=stale).values_list('need_id', flat=True))
+    lists = {row['need']: row for row in
+             SimilarNeed.objects.order_by().values('need').annotate(lowest=Min('score'), length=Count('pk'))}
+    stale_rows = [row_of[pk] for pk in stale if pk in row_of]
+    if stale_rows:
+        # Similarities are symmetric: the stale rows' scores are also their score in every other list
+        scores = matrix[stale_rows].dot(matrix.T).tocsr()
+        for column, score in zip(scores.indices.tolist(), scores.data.tolist()):
+            current = lists.get(pks[column])
+            if current is None or current['length'] < k or score > current['lowest']:
+                affected.add(pks[column])
+
+    rows = sorted(row_of[pk] for pk in affected if pk in row_of)
+    _store(pks, top_neighbours(matrix, rows, k), list(affected), versions)
+    return len(affected)
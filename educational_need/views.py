@@ -3,31 +3,57 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.core.mail import EmailMessage
 from django.db import transaction
-from django.db.models import Q
-from django.http import Http404
+from django.db.models import Count, F, Max, Q
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
 from django.views.generic.list import ListView
 
-from accounts.models import Country, Profile, State
-from comment.models import Comment
-from .models import EducationalNeed
+from accounts.geo import NearbyProfiles, geocode
+from accounts.models import City, Country, District, PostalCode, Profile, State
+from comment.testimonials import get_testimonials, testimonials_version
+from janani_home.conditional import conditional_page
+from janani_home.query_cache import table_versions
+from .aggregates import amount_buckets, amount_facets, bucket_range, listing_version
+from .aggregates import country_need_counts, state_need_counts
+from .autocomplete import suggest
+from .cards import render_cards
+from .models import AmountHistogram, EducationalNeed, NeedLocationCount, SimilarNeed
 from .forms import EducationalNeedForm, UserContactForm
 
 
+def list_validators(request):
+    """Changes whenever a need, profile or user, or the testimonials change."""
+    parts = (listing_version(), testimonials_version(),
+             table_versions(Country, State, District, City, PostalCode, AmountHistogram, NeedLocationCount))
+    return parts, None
+
+
+@method_decorator(conditional_page(list_validators), name='dispatch')
 class EducationalNeedListView(ListView):
     """Returns a listing with only active EducationalNeed objects."""
 
     model = EducationalNeed
     template_name = 'educational_need/list_view.html'
     paginate_by = 6
+    # Radius choices of the proximity search, in km
+    distances = (10, 25, 50, 100, 250)
+    default_distance = 50
     state_=None
     country_=None
+    district_=None
+    city_=None
+    amount_=None
     query_=None
+    near_=None
+    km_=None
 
     def get_queryset(self):
 
         # Select user profiles with an active educational need
-        users = Profile.objects.filter(active_educational_need__isnull=False).select_related('active_educational_need').select_related('user').order_by('-active_educational_need__pk')
+        users = Profile.objects.filter(active_educational_need__isnull=False).select_related(
+            'active_educational_need', 'user', 'country', 'state').order_by('-active_educational_need__pk')
 
         # Maybe in future we use this variable
         # filer_done = False
@@ -53,34 +79,122 @@ class EducationalNeedListView(ListView):
             except Exception as e:
                 pass
 
+        # District and city filters, on the canonical locations of profiles
+        if self.request.GET.get('district'):
+            try:
+                district = District.objects.get(pk=self.request.GET.get('district'))
+                users = users.filter(canonical_district=district)
+                self.district_ = district
+            except (District.DoesNotExist, ValueError):
+                pass
+
+        if self.request.GET.get('city'):
+            try:
+                city = City.objects.get(pk=self.request.GET.get('city'))
+                users = users.filter(canonical_city=city)
+                self.city_ = city
+            except (City.DoesNotExist, ValueError):
+                pass
+
+        # Amount range filter, on the amount in the base currency
+        if self.request.GET.get('amount'):
+            try:
+                bucket = int(self.request.GET.get('amount'))
+                low, high = bucket_range(bucket)
+            except (ValueError, IndexError):
+                pass
+            else:
+                if bucket >= 0:
+                    users = users.filter(active_educational_need__amount_base__gte=low)
+                    if high is not None:
+                        users = users.filter(active_educational_need__amount_base__lt=high)
+                    self.amount_ = bucket
+
         if self.request.GET.get('query'):
             query = self.request.GET.get('query')
-            users=users.filter(Q(city__icontains=query)|Q(district__icontains=query)|Q(zip_code__icontains=query)|Q(mobile_number__icontains=query)|Q(phone_number__icontains=query)| Q(about__icontains=query))
+            users=users.filter(Q(city__icontains=query)|Q(district__icontains=query)|Q(zip_code__icontains=query)|Q(mobile_number__icontains=query)|Q(phone_number__icontains=query)| Q(about_text__icontains=query))
             self.query_=self.request.GET.get('query')
 
-        # Select active educational needs from the user list
-        queryset = [user.active_educational_need for user in users]
-        return queryset
+        # Proximity search around a postal code or city, nearest first
+        if self.request.GET.get('near'):
+            near = self.request.GET.get('near')
+            place = geocode(self.country_.pk if self.country_ else None, near, near)
+            if place is not None:
+                try:
+                    km = int(self.request.GET.get('km'))
+                except (TypeError, ValueError):
+                    km = self.default_distance
+                self.km_ = km if km in self.distances else self.default_distance
+                self.near_ = place
+                return NearbyProfiles(users, place.latitude, place.longitude, self.km_)
+
+        # Paginate the profiles; their active needs are rendered as cards
+        return users
 
     def get_context_data(self, **kwargs):
         data = super().get_context_data(**kwargs)
-        # Country list
-        data['countries'] = Country.objects.values('name','code','pk')
-        data['comments'] = Comment.objects.filter(published=True).order_by('-pk')[:3]
+        data['cards'] = render_cards(data['object_list'], lite=self.request.lite)
+        # Countries and states with listed needs, from the maintained counters
+        counts = country_need_counts()
+        data['countries'] = [dict(country, count=counts.get(country['pk'], 0))
+                             for country in Country.objects.values('name','code','pk')
+                             if country['pk'] in counts or country['pk'] == getattr(self.country_, 'pk', None)]
+        data['comments'] = get_testimonials()
         if self.country_:
             data['country_'] = self.country_.pk
             data['active_country'] = self.country_.name
-            data['states'] = State.objects.filter(country=self.country_).values('name','code','pk')
+            counts = state_need_counts(self.country_.pk)
+            data['states'] = [dict(state, count=counts.get(state['pk'], 0))
+                              for state in State.objects.filter(country=self.country_).values('name','code','pk')
+                              if state['pk'] in counts or state['pk'] == getattr(self.state_, 'pk', None)]
         if self.state_:
             data['state_'] = self.state_.pk
             data['active_state'] = self.state_.name
+            data['districts'] = District.objects.filter(state=self.state_).values('name', 'pk')
+            data['cities'] = City.objects.filter(state=self.state_).values('name', 'pk')
+        if self.district_:
+            data['district_'] = self.district_.pk
+            data['active_district'] = self.district_.name
+        if self.city_:
+            data['city_'] = self.city_.pk
+            data['active_city'] = self.city_.name
         if self.query_:
             data['query_'] = self.query_
             data['active_query'] = self.query_
+        # Amount ranges with the number of needs in the selected country or state
+        data['amount_buckets'] = amount_buckets(amount_facets(
+            self.country_.pk if self.country_ else None, self.state_.pk if self.state_ else None))
+        if self.amount_ is not None:
+            data['amount_'] = self.amount_
+            data['active_amount'] = data['amount_buckets'][self.amount_]['label']
+        data['distances'] = self.distances
+        data['km_'] = self.km_ or self.default_distance
+        if self.near_:
+            data['near_'] = self.request.GET.get('near')
+            data['active_near'] = self.near_.place_name
+        # Filters kept by the pagination links
+        filters = self.request.GET.copy()
+        filters.pop('page', None)
+        data['filter_query'] = filters.urlencode()
 
         return data
 
 
+def detail_validators(request, pk):
+    try:
+        need, profile = EducationalNeed.objects.filter(pk=pk).values_list(
+            'updated_at', 'user__profile__updated_at').get()
+    except EducationalNeed.DoesNotExist:
+        return None
+    similar = SimilarNeed.objects.filter(need=pk).aggregate(
+        count=Count('pk'), computed=Max('computed_at'), updated=Max('similar__updated_at'))
+    # The page shows the user's name, which is saved without touching the
+    # profile; the listing version changes with every user save. No
+    # Last-Modified, as no column dates such changes.
+    return (need, profile, similar['count'], similar['computed'], similar['updated'], listing_version()), None
+
+
+@conditional_page(detail_validators)
 def detail_view(request, pk):
     """Returns a detailed view of a specific EducationalNeed object."""
     educational_need = get_object_or_404(EducationalNeed, pk=pk)
@@ -103,15 +217,29 @@ def detail_view(request, pk):
             request.session['viewed_need_{}'.format(educational_need.pk)]
         except KeyError:
             request.session['viewed_need_{}'.format(educational_need.pk)] = True
+            # update() leaves updated_at alone, so a view doesn't invalidate
+            # the cached card and the ETags of the need
+            EducationalNeed.objects.filter(pk=educational_need.pk).update(view_count=F('view_count') + 1)
             educational_need.view_count += 1
-            educational_need.save()
 
-    form = UserContactForm
-    context = {'educational_need': educational_need, 'form': form}
+    form = UserContactForm()
+    # Precomputed by `manage.py build_similar_needs`
+    similar_needs = [row.similar for row in SimilarNeed.objects.filter(
+        need=educational_need, similar__closed=False).select_related('similar')]
+    context = {'educational_need': educational_need, 'form': form, 'similar_needs': similar_needs}
     template = 'educational_need/detail_view.html'
     return render(request, template, context)
 
 
+def autocomplete(request):
+    """Returns suggestions for the search box as JSON, from the in-memory index."""
+    suggestions = suggest(request.GET.get('q', '')[:100])
+    response = JsonResponse({'suggestions': [
+        {'label': label, 'kind': kind, 'url': url} for label, kind, pk, url in suggestions]})
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
+
 @login_required
 @transaction.atomic
 def add_need(request):
@@ -142,11 +270,7 @@ def add_need(request):
         form = EducationalNeedForm()
 
     # Check if user profile has required information for adding a need
-    # It will be False if any of the fields is blank or null
-    profile_complete = all([request.user.first_name, request.user.last_name,
-                           request.user.email, request.user.profile.birth_date,
-                           request.user.profile.mobile_number, request.user.profile.city,
-                           request.user.profile.state, request.user.profile.country])
+    profile_complete = request.user.profile.is_complete()
 
     # Create context dictionary which can be accessed in template
     context = {'form': form, 'profile_complete': profile_complete}
@@ -175,11 +299,7 @@ def edit_need(request, pk):
         form = EducationalNeedForm(instance=educational_need)
 
     # Check if user profile has required information for adding a need
-	# It will be False if any of the fields is blank or null
-    profile_complete = all([request.user.first_name, request.user.last_name,
-                           request.user.email, request.user.profile.birth_date,
-                           request.user.profile.mobile_number, request.user.profile.city,
-                           request.user.profile.state, request.user.profile.country])
+    profile_complete = request.user.profile.is_complete()
 
     # Create context dictionary which can be accessed in template
     context = {'form': form, 'profile_complete': profile_complete}
@@ -0,0 +1,64 @@
+"""
+Parsing of the YouTube links users give for their needs.
+"""
+import re
+from urllib.parse import parse_qs, urlparse
+
+YOUTUBE_HOSTS = ('youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com',
+                 'youtube-nocookie.com', 'www.youtube-nocookie.com')
+VIDEO_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+PATH_ID_RE = re.compile(r'^/(?:embed|v|shorts|live)/([^/?#]+)')
+PLAYLIST_ID_RE = re.compile(r'^[A-Za-z0-9_-]{2,64}$')
+
+EMBED_URL = 'https://www.youtube-nocookie.com/embed/{}'
+PLAYLIST_EMBED_URL = 'https://www.youtube-nocookie.com/embed/videoseries?list={}'
+THUMBNAIL_URL = 'https://i.ytimg.com/vi/{}/hqdefault.jpg'
+
+
+def _valid(video_id):
+    return video_id if video_id and VIDEO_ID_RE.match(video_id) else None
+
+
+def _parse(url):
+    """Returns the parsed URL and its host, or (None, None) unless it is http(s)."""
+    parsed = urlparse(url.strip())
+    if parsed.scheme.lower() not in ('http', 'https'):
+        return None, None
+    return parsed, parsed.netloc.lower().split(':')[0]
+
+
+def parse_video_id(url):
+    """
+    Returns the video id of a YouTube link (watch, youtu.be, embed, shorts
+    and playlist links with a current video), or None.
+    """
+    if not url:
+        return None
+    parsed, host = _parse(url)
+    if host == 'youtu.be':
+        return _valid(parsed.path.strip('/').split('/')[0])
+    if host not in YOUTUBE_HOSTS:
+        return None
+    match = PATH_ID_RE.match(parsed.path)
+    if match:
+        return _valid(match.group(1))
+    return _valid(parse_qs(parsed.query).get('v', [None])[0])
+
+
+def parse_playlist_id(url):
+    """Returns the playlist id of a YouTube link, or None."""
+    if not url:
+        return None
+    parsed, host = _parse(url)
+    if host != 'youtu.be' and host not in YOUTUBE_HOSTS:
+        return None
+    playlist_id = parse_qs(parsed.query).get('list', [None])[0]
+    return playlist_id if playlist_id and PLAYLIST_ID_RE.match(playlist_id) else None
+
+
+def embed_url(video_id=None, playlist_id=None):
+    if video_id:
+        return EMBED_URL.format(video_id)
+    if playlist_id:
+        return PLAYLIST_EMBED_URL.format(playlist_id)
+    return None
@@ -0,0 +1,163 @@
+"""
+Helpers on top of the configured caches: versioned key namespaces, stampede
+protected recomputation and decorators for cached querysets and fragments.
+"""
+import functools
+import hashlib
+import math
+import random
+import time
+import uuid
+
+from django.core.cache import cache as default_cache
+
+
+def _shared(cache):
+    """The cache every process sees, bypassing a local tier if there is one."""
+    return getattr(cache, 'shared', cache)
+
+
+def _version_key(namespace):
+    return 'version:{}'.format(namespace)
+
+
+def _initial_version():
+    """
+    Version of a namespace whose version key is missing, e.g. evicted. It is
+    seeded from the clock, so it is higher than any version the namespace
+    had before (unless bumped more than a thousand times a second) and keys
+    stored under old versions never come back.
+    """
+    return int(time.time() * 1000)
+
+
+def namespace_version(namespace, cache=None):
+    """Returns the current version of a key namespace."""
+    return namespace_versions([namespace], cache)[namespace]
+
+
+def namespace_versions(namespaces, cache=None):
+    """Returns the current versions of several namespaces in one round trip."""
+    shared = _shared(cache or default_cache)
+    keys = {namespace: _version_key(namespace) for namespace in namespaces}
+    found = shared.get_many(keys.values())
+    versions = {}
+    for namespace, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = _initial_version()
+            if not shared.add(key, version, None):
+                # Another process seeded it first
+                version = shared.get(key) or version
+        versions[namespace] = version
+    return versions
+
+
+def bump_namespace(namespace, cache=None):
+    """
+    Moves a namespace to a new version, which invalidates every key built
+    with versioned_key() for it.
+    """
+    shared = _shared(cache or default_cache)
+    try:
+        return shared.incr(_version_key(namespace))
+    except ValueError:
+        version = _initial_version()
+        shared.set(_version_key(namespace), version, None)
+        return version
+
+
+def versioned_key(namespace, *parts, cache=None):
+    """Builds a cache key within the current version of a namespace."""
+    key = '{}:{}'.format(namespace, namespace_version(namespace, cache))
+    if parts:
+        key += ':' + ':'.join(str(part) for part in parts)
+    return key
+
+
+def get_or_compute(key, compute, timeout=300, cache=None, beta=1.0, lock_timeout=30):
+    """
+    Returns the cached value of key, calling compute() on a miss.
+
+    Protects against stampedes in two ways: while one process recomputes a
+    key (holding a lock in the shared tier) others keep serving the old value,
+    and values are recomputed early with a probability that grows as their
+    expiry approaches (XFetch), so hot keys rarely expire at all. The lock is
+    only as atomic as the shared backend's add(): memcached's is, while the
+    file based cache used in development only limits stampedes.
+    """
+    cache = cache or default_cache
+    shared = _shared(cache)
+    lock_key = 'lock:{}'.format(key)
+    token = uuid.uuid4().hex
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expires = entry
+        if time.time() - delta * beta * math.log(random.random() or 1e-12) < expires:
+            return value
+        if not shared.add(lock_key, token, lock_timeout):
+            return value
+        locked = True
+    else:
+        locked = shared.add(lock_key, token, lock_timeout)
+        if not locked:
+            # Someone else is computing a missing value; wait a little for it.
+            for attempt in range(10):
+                time.sleep(0.05)
+                entry = cache.get(key)
+                if entry is not None:
+                    return entry[0]
+    try:
+        start = time.time()
+        value = compute()
+        delta = time.time() - start
+        expires = float('inf') if timeout is None else time.time() + timeout
+        cache.set(key, (value, delta, expires), timeout)
+    finally:
+        # Never release a lock another process holds
+        if locked and shared.get(lock_key) == token:
+            shared.delete(lock_key)
+    return value
+
+
+def _call_key(namespace, func, args, kwargs):
+    call = repr((func.__module__, func.__qualname__, args, sorted(kwargs.items())))
+    return versioned_key(namespace, hashlib.md5(call.encode('utf-8')).hexdigest())
+
+
+def cached_queryset(namespace, timeout=300):
+    """
+    Decorator caching the rows of the queryset a function returns, as a list,
+    per call arguments. bump_namespace(namespace) invalidates all of them.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return get_or_compute(
+                _call_key(namespace, func, args, kwargs),
+                lambda: list(func(*args, **kwargs)),
+                timeout)
+        return wrapper
+    return decorator
+
+
+def cached_fragment(namespace, timeout=300):
+    """
+    Decorator caching the HTML a rendering function returns per call
+    arguments. bump_namespace(namespace) invalidates all of them.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return get_or_compute(
+                _call_key(namespace, func, args, kwargs),
+                lambda: func(*args, **kwargs),
+                timeout)
+        return wrapper
+    return decorator
+
+
+def cache_stats(cache=None):
+    """Returns the hit, miss and eviction counters of a tiered cache."""
+    cache = cache or default_cache
+    return cache.stats() if hasattr(cache, 'stats') else {}
@@ -0,0 +1,169 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.utils.functional import cached_property
+
+
+class LocalLRU(object):
+    """Size-bounded in-process store evicting the least recently used keys."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Returns (found, pickled value)."""
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return False, None
+            pickled, expires = entry
+            if expires < time.time():
+                del self.data[key]
+                return False, None
+            self.data.move_to_end(key)
+            return True, pickled
+
+    def set(self, key, pickled, timeout):
+        """Stores the value and returns the number of evicted keys."""
+        evicted = 0
+        with self.lock:
+            self.data[key] = (pickled, time.time() + timeout)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class TieredCache(BaseCache):
+    """
+    Two level cache: an in-process LRU tier in front of a shared cache.
+
+    Reads check the local tier first and fill it from the shared tier. Writes
+    go to both. Local entries live at most LOCAL_TIMEOUT seconds, which bounds
+    how long other processes can serve a value after it changed; anything that
+    must be consistent across processes should read from `shared` directly.
+
+    OPTIONS:
+        SHARED_ALIAS: name of the shared cache in CACHES (default 'shared')
+        LOCAL_MAX_ENTRIES: size of the local tier (default 1000)
+        LOCAL_TIMEOUT: lifetime of local entries in seconds (default 5)
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED_ALIAS', 'shared')
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._local = LocalLRU(options.get('LOCAL_MAX_ENTRIES', 1000))
+        self._stats_lock = threading.Lock()
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'evictions': 0}
+
+    @cached_property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _count(self, name, value=1):
+        with self._stats_lock:
+            self._stats[name] += value
+
+    def stats(self):
+        """Returns the hit, miss and eviction counters of this process."""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _local_set(self, key, value, version, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        local_timeout = self._local_timeout if timeout is None else min(timeout, self._local_timeout)
+        if local_timeout <= 0:
+            return
+        key = self.make_key(key, version=version)
+        evicted = self._local.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), local_timeout)
+        if evicted:
+            self._count('evictions', evicted)
+
+    def get(self, key, default=None, version=None):
+        found, pickled = self._local.get(self.make_key(key, version=version))
+        if found:
+            self._count('local_hits')
+            return pickle.loads(pickled)
+        sentinel = object()
+        value = self.shared.get(key, sentinel, version=version)
+        if value is sentinel:
+            self._count('misses')
+            return default
+        self._count('shared_hits')
+        self._local_set(key, value, version, self._local_timeout)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            hit, pickled = self._local.get(self.make_key(key, version=version))
+            if hit:
+                found[key] = pickle.loads(pickled)
+            else:
+                missing.append(key)
+        self._count('local_hits', len(found))
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+            self._count('shared_hits', len(shared))
+            self._count('misses', len(missing) - len(shared))
+            for key, value in shared.items():
+                self._local_set(key, value, version, self._local_timeout)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._local_set(key, value, version, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version) or []
+        for key, value in data.items():
+            if key not in failed:
+                self._local_set(key, value, version, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._local_set(key, value, version, timeout)
+        return added
+
+    def delete(self, key, version=None):
+        self._local.delete(self.make_key(key, version=version))
+        self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._local.delete(self.make_key(key, version=version))
+        self.shared.delete_many(keys, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._local.delete(self.make_key(key, version=version))
+        return self.shared.incr(key, delta, version=version)
+
+    def has_key(self, key, version=None):
+        found, pickled = self._local.get(self.make_key(key, version=version))
+        return found or self.shared.has_key(key, version=version)
+
+    def clear(self):
+        self._local.clear()
+        self.shared.clear()
@@ -0,0 +1,87 @@
+"""
+Conditional GET and Cache-Control for the public pages.
+
+A view decorated with conditional_page() declares a validators function
+which gets the view's arguments and returns (parts, last_modified), both
+computed from cheap columns such as updated_at. The parts are hashed into a
+weak ETag together with what every page shows (the visitor and the menu
+pages), so a repeat visit gets a 304 without running the view.
+"""
+import functools
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from cms.models import Page
+from .query_cache import table_versions
+
+
+def _has_messages(request):
+    # len() doesn't mark the messages as used, iterating would
+    storage = get_messages(request)
+    return storage is not None and len(storage) > 0
+
+
+def _etag(request, parts):
+    visitor = request.user.pk if request.user.is_authenticated else 'anonymous'
+    lite = getattr(request, 'lite', False)
+    signature = repr((visitor, lite, table_versions(Page), parts))
+    return 'W/"{}"'.format(hashlib.md5(signature.encode('utf-8')).hexdigest())
+
+
+def patch_page_cache_control(request, response):
+    """
+    Lets browsers and proxies keep anonymous pages for PUBLIC_CACHE_MAX_AGE
+    seconds and serve them stale while revalidating. Responses that are
+    personal, or that set cookies, must always be revalidated.
+    """
+    if response.has_header('Cache-Control'):
+        return response
+    patch_vary_headers(response, ('Cookie',))
+    # ?lite sets or deletes the lite mode cookie
+    if (request.user.is_authenticated or request.session.modified or
+            request.META.get('CSRF_COOKIE_USED') or 'lite' in request.GET or
+            _has_messages(request)):
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response, public=True,
+            max_age=getattr(settings, 'PUBLIC_CACHE_MAX_AGE', 60),
+            stale_while_revalidate=getattr(settings, 'PUBLIC_CACHE_STALE_WHILE_REVALIDATE', 600))
+    return response
+
+
+def conditional_page(validators):
+    """
+    Decorator adding ETag and Last-Modified validators and Cache-Control to a
+    view. validators(request, *args, **kwargs) returns (parts, last_modified),
+    or None when the requested object doesn't exist.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag = last_modified = response = None
+            # Pending messages are shown once, so such pages are never a 304
+            if request.method in ('GET', 'HEAD') and not _has_messages(request):
+                found = validators(request, *args, **kwargs)
+                if found is not None:
+                    parts, modified = found
+                    etag = _etag(request, parts)
+                    last_modified = timegm(modified.utctimetuple()) if modified else None
+                    response = get_conditional_response(
+                        request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                if etag and not response.has_header('ETag'):
+                    response['ETag'] = etag
+                if last_modified and not response.has_header('Last-Modified'):
+                    response['Last-Modified'] = http_date(last_modified)
+                patch_page_cache_control(request, response)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,36 @@
+import functools
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+from .storage_backends import minify_css
+
+
+@functools.lru_cache()
+def _critical_css():
+    path = finders.find(settings.CRITICAL_CSS)
+    with open(path, encoding='utf-8') as critical_css:
+        return minify_css(critical_css.read())
+
+
+def bundle_urls(name, sources):
+    # Bundles only exist after collectstatic; in development load the sources
+    if settings.DEBUG:
+        return [staticfiles_storage.url(source) for source in sources]
+    return [staticfiles_storage.url(name)]
+
+
+def static_bundles(request):
+    """Makes the STATIC_BUNDLES URLs and the critical CSS available to all
+    templates."""
+    return {
+        'bundles': {key: bundle_urls(name, sources)
+                    for key, (name, sources) in settings.STATIC_BUNDLES.items()},
+        'critical_css': _critical_css(),
+    }
+
+
+def lite_mode(request):
+    """Tells templates whether to render the low-bandwidth pages."""
+    return {'lite': getattr(request, 'lite', False)}
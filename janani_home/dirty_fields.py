@@ -0,0 +1,61 @@
+from django.db.models.fields.files import FieldFile
+
+
+class DirtyFieldsMixin(object):
+    """
+    Model mixin that remembers the field values loaded from the database.
+
+    Saving an existing object only writes the columns that changed since it
+    was loaded (plus auto_now columns), and a save without changes is skipped.
+    Passing update_fields explicitly bypasses the tracking.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._original_state = self._current_state()
+
+    def _current_state(self, fields=None):
+        deferred = self.get_deferred_fields()
+        state = {}
+        for field in self._meta.concrete_fields:
+            if field.attname in deferred:
+                continue
+            if fields is not None and field.attname not in fields and field.name not in fields:
+                continue
+            value = getattr(self, field.attname)
+            if isinstance(value, FieldFile):
+                # Files assigned but not yet stored always count as changed
+                value = value.name if value._committed else value
+            state[field.attname] = value
+        return state
+
+    def get_dirty_fields(self):
+        """Returns the attnames of the fields changed since loading."""
+        original = self._original_state
+        return [name for name, value in self._current_state().items()
+                if isinstance(value, FieldFile) or name not in original or original[name] != value]
+
+    def has_changed(self, name):
+        return name in self.get_dirty_fields()
+
+    def get_original(self, name):
+        """Returns the value a field had when the object was loaded."""
+        return self._original_state.get(name)
+
+    def save(self, *args, **kwargs):
+        tracked = (not args and not self._state.adding and self.pk is not None
+                   and kwargs.get('update_fields') is None
+                   and not kwargs.get('force_insert'))
+        if tracked:
+            dirty = self.get_dirty_fields()
+            if not dirty:
+                return
+            dirty += [field.attname for field in self._meta.concrete_fields
+                      if getattr(field, 'auto_now', False) and field.attname not in dirty]
+            kwargs['update_fields'] = dirty
+        super().save(*args, **kwargs)
+        self._original_state.update(self._current_state(kwargs.get('update_fields')))
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._original_state.update(self._current_state(fields))
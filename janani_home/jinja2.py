@@ -0,0 +1,41 @@
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.template import defaultfilters
+from django.urls import reverse
+from django.utils.formats import localize
+from easy_thumbnails.templatetags.thumbnail import thumbnail_url
+from jinja2 import Environment
+
+
+def url(viewname, *args, **kwargs):
+    """Jinja2 counterpart of {% url %}."""
+    return reverse(viewname, args=args or None, kwargs=kwargs or None)
+
+
+def render_field(field, **attrs):
+    """
+    Jinja2 counterpart of widget_tweaks' {% render_field %}. class_ is added
+    to the widget's classes like class+="..."; other keyword arguments are set
+    as attributes.
+    """
+    widget_attrs = dict(field.field.widget.attrs)
+    extra_class = attrs.pop('class_', None)
+    if extra_class:
+        widget_attrs['class'] = '{} {}'.format(widget_attrs.get('class', ''), extra_class).strip()
+    widget_attrs.update(attrs)
+    return field.as_widget(attrs=widget_attrs)
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update({
+        'static': staticfiles_storage.url,
+        'url': url,
+        'render_field': render_field,
+    })
+    env.filters.update({
+        'localize': localize,
+        'striptags': defaultfilters.striptags,
+        'thumbnail_url': thumbnail_url,
+        'truncatechars': defaultfilters.truncatechars,
+    })
+    return env
@@ -0,0 +1,148 @@
+"""
+Response pipeline for rendered pages: HTML minification followed by Brotli
+or gzip compression, negotiated by Accept-Encoding. Also decides whether a
+visitor gets the low-bandwidth (lite) pages.
+
+Brotli comes from the Brotli package in requirements.txt; without it, only
+gzip is offered.
+Static files are served and compressed by WhiteNoise and never get here.
+"""
+import logging
+import re
+import threading
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Elements whose content must be kept as is
+PRESERVED_RE = re.compile(r'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.IGNORECASE | re.DOTALL)
+# Comments, except conditional comments for old IE
+COMMENT_RE = re.compile(r'<!--(?!\[if|<!\[endif).*?-->', re.DOTALL)
+BETWEEN_TAGS_RE = re.compile(r'>\s+<')
+WHITESPACE_RE = re.compile(r'\s{2,}')
+
+LITE_COOKIE = 'lite'
+LITE_COOKIE_AGE = 60 * 60 * 24 * 365
+
+_stats_lock = threading.Lock()
+_stats = {'responses': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+
+def minify_html(html):
+    """Strips comments and collapses whitespace outside of pre, textarea,
+    script and style elements."""
+    parts = PRESERVED_RE.split(html)
+    minified = []
+    # split() returns text, element, tag name, text, element, tag name...
+    for index in range(0, len(parts), 3):
+        text = COMMENT_RE.sub('', parts[index])
+        text = BETWEEN_TAGS_RE.sub('> <', text)
+        minified.append(WHITESPACE_RE.sub(' ', text))
+        if index + 1 < len(parts):
+            minified.append(parts[index + 1])
+    return ''.join(minified).strip()
+
+
+def compression_stats():
+    """Returns the bytes before and after the pipeline in this process."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['bytes_saved'] = stats['bytes_in'] - stats['bytes_out']
+    return stats
+
+
+def _accepted_encoding(request):
+    accepted = {
+        token.split(';')[0].strip().lower()
+        for token in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')
+    }
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+class CompressionMiddleware(object):
+    """
+    Minifies HTML responses and compresses responses of at least
+    COMPRESSION_MIN_LENGTH bytes. Streaming, already encoded and error
+    responses pass through unchanged.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_length = getattr(settings, 'COMPRESSION_MIN_LENGTH', 500)
+        self.minify = getattr(settings, 'HTML_MINIFY', True)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (response.streaming or response.status_code != 200 or
+                response.has_header('Content-Encoding')):
+            return response
+        original_length = len(response.content)
+
+        if self.minify and response.get('Content-Type', '').startswith('text/html'):
+            response.content = minify_html(response.content.decode(response.charset)).encode(response.charset)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = _accepted_encoding(request)
+        if encoding and len(response.content) >= self.min_length:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=5)
+            else:
+                compressed = compress_string(response.content)
+            if len(compressed) < len(response.content):
+                response.content = compressed
+                response['Content-Encoding'] = encoding
+                # The body differs from the identity representation
+                etag = response.get('ETag')
+                if etag and etag.startswith('"'):
+                    response['ETag'] = 'W/' + etag
+
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(response.content))
+        self._record(request, original_length, len(response.content))
+        return response
+
+    def _record(self, request, bytes_in, bytes_out):
+        with _stats_lock:
+            _stats['responses'] += 1
+            _stats['bytes_in'] += bytes_in
+            _stats['bytes_out'] += bytes_out
+        logger.debug('%s: %d bytes sent instead of %d', request.path, bytes_out, bytes_in)
+
+
+class LiteModeMiddleware(object):
+    """
+    Sets request.lite for visitors who want the low-bandwidth pages: browsers
+    sending Save-Data, ?lite=1 (remembered in a cookie until ?lite=0) or that
+    cookie.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        flag = request.GET.get('lite')
+        if flag is not None:
+            request.lite = flag not in ('', '0', 'off')
+        else:
+            request.lite = (request.META.get('HTTP_SAVE_DATA', '').lower() == 'on' or
+                            request.COOKIES.get(LITE_COOKIE) == '1')
+        response = self.get_response(request)
+        patch_vary_headers(response, ('Save-Data',))
+        if flag is not None:
+            if request.lite:
+                response.set_cookie(LITE_COOKIE, '1', max_age=LITE_COOKIE_AGE)
+            else:
+                response.delete_cookie(LITE_COOKIE)
+        return response
@@ -0,0 +1,106 @@
+"""
+Opt-in ORM query cache for read-mostly models.
+
+Models get it by using CachedManager as their manager. Evaluated querysets
+whose tables all belong to such models are cached under a key built from
+their SQL, parameters and the current version of every table involved.
+Any write to one of these models bumps its table version once the
+transaction commits, which invalidates every cached query that read it.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from .cache import bump_namespace, get_or_compute, namespace_versions
+
+cached_tables = set()
+
+
+def _table_namespace(table):
+    return 'query-cache:{}'.format(table)
+
+
+def invalidate_table(table):
+    transaction.on_commit(lambda: bump_namespace(_table_namespace(table)))
+
+
+def table_versions(*models):
+    """
+    Returns the current query cache versions of the tables of models. They
+    change on every write, so they make cheap validators for cached pages.
+    """
+    versions = namespace_versions([_table_namespace(model._meta.db_table) for model in models])
+    return tuple(versions[_table_namespace(model._meta.db_table)] for model in models)
+
+
+def _invalidate_instance(sender, **kwargs):
+    invalidate_table(sender._meta.db_table)
+
+
+class CachedQuerySet(models.QuerySet):
+
+    def _query_cache_key(self):
+        """
+        Returns the cache key of this queryset, or None when it can't be
+        cached safely.
+        """
+        if (not getattr(settings, 'QUERY_CACHE_ENABLED', True) or
+                self._prefetch_related_lookups or self.query.select_for_update or
+                connections[self.db].in_atomic_block):
+            return None
+        compiler = self.query.clone().get_compiler(using=self.db)
+        try:
+            sql, params = compiler.as_sql()
+        except EmptyResultSet:
+            return None
+        tables = {join.table_name for join in compiler.query.alias_map.values()}
+        # Subqueries may read tables that are not in the alias map
+        if not tables or not tables <= cached_tables or sql.count('SELECT') > 1:
+            return None
+        versions = namespace_versions([_table_namespace(table) for table in tables])
+        # values('pk') and values('id') run the same SQL but name rows differently
+        signature = repr((self.db, self._iterable_class.__name__, self._fields, sql, params,
+                          sorted(versions.items())))
+        return 'query-cache:{}'.format(hashlib.md5(signature.encode('utf-8')).hexdigest())
+
+    def _fetch_all(self):
+        if self._result_cache is None:
+            key = self._query_cache_key()
+            if key is not None:
+                self._result_cache = get_or_compute(
+                    key, self._fetch_rows, getattr(settings, 'QUERY_CACHE_TIMEOUT', 60 * 60))
+        super()._fetch_all()
+
+    def _fetch_rows(self):
+        return list(self._iterable_class(self))
+
+    def update(self, **kwargs):
+        invalidate_table(self.model._meta.db_table)
+        return super().update(**kwargs)
+    update.alters_data = True
+
+    def _raw_delete(self, using):
+        invalidate_table(self.model._meta.db_table)
+        return super()._raw_delete(using)
+    _raw_delete.alters_data = True
+
+    def bulk_create(self, objs, batch_size=None):
+        invalidate_table(self.model._meta.db_table)
+        return super().bulk_create(objs, batch_size=batch_size)
+
+
+class CachedManager(models.Manager.from_queryset(CachedQuerySet)):
+    """Manager that puts the queries of its model in the query cache."""
+
+    def contribute_to_class(self, model, name):
+        super().contribute_to_class(model, name)
+        if not model._meta.abstract and model._meta.db_table not in cached_tables:
+            cached_tables.add(model._meta.db_table)
+            post_save.connect(_invalidate_instance, sender=model, weak=False)
+            post_delete.connect(_invalidate_instance, sender=model, weak=False)
+            for field in model._meta.local_many_to_many:
+                cached_tables.add(field.remote_field.through._meta.db_table)
+                m2m_changed.connect(_invalidate_instance, sender=field.remote_field.through, weak=False)
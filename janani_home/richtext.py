@@ -0,0 +1,192 @@
+"""
+Pre-rendering of the CKEditor fields.
+
+Rich text is parsed once, when it is saved, into companion columns: sanitized
+HTML (<field>_html), plain text (<field>_text) and a short excerpt
+(<field>_excerpt). Templates and searches read those, so requests never parse
+user HTML.
+
+Rows remember the SANITIZER_VERSION their columns were rendered with, in
+rich_text_version. Bump it whenever the sanitizer changes: rows rendered by
+an older version are rendered again when they are loaded, so no HTML the
+old sanitizer let through is served, and `manage.py backfill_rich_text`
+renders the rest.
+"""
+import re
+from html import escape
+from html.parser import HTMLParser
+
+from django.utils import timezone
+from django.utils.text import Truncator
+
+ALLOWED_TAGS = {
+    'a', 'b', 'blockquote', 'br', 'code', 'div', 'em', 'h1', 'h2', 'h3', 'h4',
+    'h5', 'h6', 'hr', 'i', 'img', 'li', 'ol', 'p', 'pre', 's', 'span', 'strike',
+    'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th', 'thead', 'tr', 'u', 'ul',
+}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+ALLOWED_SCHEMES = {'http', 'https', 'mailto'}
+# Browsers ignore these in URLs, so 'java\tscript:' still runs as javascript:
+IGNORED_URL_CHARACTERS_RE = re.compile(r'[\x00-\x20\x7f]+')
+SCHEME_RE = re.compile(r'^([^/?#]*):')
+# Elements dropped together with everything inside them
+DROPPED_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'head', 'title'}
+VOID_TAGS = {'br', 'hr', 'img'}
+# Elements that separate words in the plain text version
+BLOCK_TAGS = {
+    'blockquote', 'br', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li',
+    'ol', 'p', 'pre', 'table', 'td', 'th', 'tr', 'ul',
+}
+
+EXCERPT_LENGTH = 160
+# Bump when the rendering changes (2: schemes hidden by whitespace rejected)
+SANITIZER_VERSION = 2
+
+
+def is_safe_url(value):
+    """
+    Whether a link or image URL is relative or starts with an allowed scheme,
+    judged the way a browser reads it.
+    """
+    match = SCHEME_RE.match(IGNORED_URL_CHARACTERS_RE.sub('', value))
+    return match is None or match.group(1).lower() in ALLOWED_SCHEMES
+
+
+class RichTextParser(HTMLParser):
+    """Builds the sanitized HTML and the plain text of a document in one pass."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        rendered = [tag]
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not is_safe_url(value):
+                continue
+            rendered.append('{}="{}"'.format(name, escape(value, quote=True)))
+        if tag == 'a':
+            rendered.append('rel="nofollow noopener"')
+        self.html.append('<{}>'.format(' '.join(rendered)))
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in self.open_tags:
+            return
+        # Close anything left open inside this element as well
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.html.append('</{}>'.format(open_tag))
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.html.append('</{}>'.format(self.open_tags.pop()))
+
+
+def render_rich_text(html):
+    """Returns (sanitized HTML, plain text, excerpt) of a rich text value."""
+    parser = RichTextParser()
+    parser.feed(html or '')
+    parser.close()
+    text = ' '.join(''.join(parser.text).split())
+    return ''.join(parser.html), text, Truncator(text).chars(EXCERPT_LENGTH)
+
+
+def rich_text_columns(instance, field_name):
+    """Returns the companion column values of one rich text field."""
+    sanitized, text, excerpt = render_rich_text(getattr(instance, field_name))
+    return {
+        '{}_html'.format(field_name): sanitized,
+        '{}_text'.format(field_name): text,
+        '{}_excerpt'.format(field_name): excerpt,
+    }
+
+
+class RichTextColumnsMixin(object):
+    """
+    Model mixin keeping the companion columns of the fields listed in
+    rich_text_fields, and rich_text_version, up to date. With
+    DirtyFieldsMixin, fields that didn't change are not parsed again.
+    """
+    rich_text_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = instance.__dict__
+        if ('rich_text_version' in loaded and instance.rich_text_version < SANITIZER_VERSION and
+                all(field_name in loaded for field_name in instance.rich_text_fields)):
+            instance.update_rich_text()
+        return instance
+
+    def update_rich_text(self):
+        """
+        Renders the companion columns of all rich text fields again and
+        stores them, without saving anything else. updated_at moves on, so
+        cached pages and cards showing the old HTML are rendered again.
+        """
+        columns = {'rich_text_version': SANITIZER_VERSION}
+        for field_name in self.rich_text_fields:
+            columns.update(rich_text_columns(self, field_name))
+        if any(field.attname == 'updated_at' for field in self._meta.concrete_fields):
+            columns['updated_at'] = timezone.now()
+        type(self)._default_manager.filter(pk=self.pk).update(**columns)
+        for name, value in columns.items():
+            setattr(self, name, value)
+        if hasattr(self, '_original_state'):
+            self._original_state.update(columns)
+
+    def save(self, *args, **kwargs):
+        outdated = self.rich_text_version < SANITIZER_VERSION
+        for field_name in self.rich_text_fields:
+            if (self.pk is not None and hasattr(self, 'has_changed') and not outdated and
+                    not self.has_changed(field_name) and
+                    getattr(self, '{}_html'.format(field_name))):
+                continue
+            for name, value in rich_text_columns(self, field_name).items():
+                setattr(self, name, value)
+        self.rich_text_version = SANITIZER_VERSION
+        super().save(*args, **kwargs)
@@ -0,0 +1,193 @@
+"""
+Session engine that serves sessions from the cache and writes them to the
+database behind a short delay.
+
+Reads and writes go to the cache named by SESSION_CACHE_ALIAS right away.
+Database writes are queued per process and flushed by a background thread
+after SESSION_WRITE_DELAY seconds, so repeated modifications of a session
+collapse into a single UPDATE. The same thread deletes expired sessions every
+SESSION_SWEEP_INTERVAL seconds (one worker per interval).
+
+The cache must be shared between workers for sessions to be consistent
+before their pending writes are flushed. Deleting a session leaves a
+tombstone in it, so that a write still queued by another worker can't bring
+the session back after a logout or cycle_key(). Only the worker that created
+a session inserts its row; the others only update existing rows.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.db import IntegrityError, close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+SWEEP_LOCK_KEY = 'janani_home.session:sweep-lock'
+TOMBSTONE_PREFIX = 'janani_home.session:deleted:'
+# Flushes an update waits for the row inserted by the worker that created the session
+MAX_UPDATE_ATTEMPTS = 3
+
+
+def _tombstone_key(session_key):
+    return TOMBSTONE_PREFIX + session_key
+
+
+class WriteBehindQueue(object):
+    """Pending session writes of this process, keyed by session key."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.thread = None
+        self.pid = None
+        self.last_sweep = time.time()
+
+    def enqueue(self, session_key, session_data, expire_date, created=False):
+        with self.lock:
+            # A session created here stays an insert until it is flushed
+            created = created or self.pending.get(session_key, (None, None, False, 0))[2]
+            self.pending[session_key] = (session_data, expire_date, created, 0)
+        self._ensure_thread()
+
+    def discard(self, session_key):
+        with self.lock:
+            self.pending.pop(session_key, None)
+
+    def get(self, session_key):
+        """Returns the pending (session_data, expire_date) of a session, or None."""
+        with self.lock:
+            pending = self.pending.get(session_key)
+        return pending[:2] if pending is not None else None
+
+    def _requeue(self, pending):
+        # Writes enqueued meanwhile are newer and win
+        with self.lock:
+            for session_key, entry in pending.items():
+                self.pending.setdefault(session_key, entry)
+
+    def _ensure_thread(self):
+        # Threads do not survive gunicorn's fork, so check the owner pid
+        if self.thread is not None and self.pid == os.getpid() and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or self.pid != os.getpid() or not self.thread.is_alive():
+                self.pid = os.getpid()
+                self.thread = threading.Thread(target=self._run, name='session-writer')
+                self.thread.daemon = True
+                self.thread.start()
+
+    def _run(self):
+        delay = getattr(settings, 'SESSION_WRITE_DELAY', 5)
+        while True:
+            time.sleep(delay)
+            try:
+                self.flush()
+                self.sweep()
+            except Exception:
+                logger.exception('Session write-behind failed')
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """Write all pending sessions to the database."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        retry = {}
+        try:
+            deleted = SessionStore.get_cache().get_many([_tombstone_key(key) for key in pending])
+            with transaction.atomic():
+                for session_key, (session_data, expire_date, created, attempts) in pending.items():
+                    if _tombstone_key(session_key) in deleted:
+                        continue
+                    updated = Session.objects.filter(session_key=session_key).update(
+                        session_data=session_data, expire_date=expire_date)
+                    if updated:
+                        continue
+                    if not created:
+                        # The row is deleted, or not inserted by its creator yet
+                        if attempts + 1 < MAX_UPDATE_ATTEMPTS:
+                            retry[session_key] = (session_data, expire_date, created, attempts + 1)
+                        continue
+                    try:
+                        with transaction.atomic():
+                            Session.objects.create(
+                                session_key=session_key,
+                                session_data=session_data,
+                                expire_date=expire_date)
+                    except IntegrityError:
+                        pass
+        except Exception:
+            self._requeue(pending)
+            raise
+        self._requeue(retry)
+
+    def sweep(self):
+        """Delete expired sessions, at most once per interval over all workers."""
+        interval = getattr(settings, 'SESSION_SWEEP_INTERVAL', 60 * 60)
+        if time.time() - self.last_sweep < interval:
+            return
+        self.last_sweep = time.time()
+        if SessionStore.get_cache().add(SWEEP_LOCK_KEY, True, interval):
+            SessionStore.clear_expired()
+
+
+write_queue = WriteBehindQueue()
+atexit.register(write_queue.flush)
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = 'janani_home.session'
+
+    @classmethod
+    def get_cache(cls):
+        return caches[settings.SESSION_CACHE_ALIAS]
+
+    def load(self):
+        if self.session_key is None:
+            return super().load()
+        data = self._cache.get(self.cache_key)
+        if data is not None:
+            return data
+        # The cached copy is gone, but a newer one may still wait for its
+        # database write in this process.
+        pending = write_queue.get(self.session_key)
+        if pending is not None:
+            session_data, expire_date = pending
+            data = self.decode(session_data)
+            self._cache.set(self.cache_key, data,
+                            self.get_expiry_age(expiry=expire_date))
+            return data
+        return super().load()
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        expiry_age = self.get_expiry_age()
+        if must_create:
+            # The cache is the first store to see a new key, so it decides
+            # whether the key is unique.
+            if not self._cache.add(self.cache_key, data, expiry_age):
+                raise CreateError
+        else:
+            self._cache.set(self.cache_key, data, expiry_age)
+        write_queue.enqueue(self.session_key, self.encode(data), self.get_expiry_date(), created=must_create)
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        # Other workers may still have writes of the session queued
+        self._cache.set(_tombstone_key(session_key), True, settings.SESSION_COOKIE_AGE)
+        write_queue.discard(session_key)
+        super().delete(session_key)
@@ -2,6 +2,7 @@ import os
 
 import dj_database_url
 from decouple import config, Csv
+from django.core.exceptions import ImproperlyConfigured
 
 # General app config
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', cast=Csv())
@@ -10,6 +11,12 @@ DEBUG = config('DEBUG', default=False, cast=bool)
 SECRET_KEY = config('SECRET_KEY')
 SERVER_EMAIL = config('SERVER_EMAIL', default='root@localhost')
 SESSION_COOKIE_AGE = 60 * 30
+SESSION_ENGINE = 'janani_home.session_backend'
+SESSION_CACHE_ALIAS = 'shared'
+# Seconds session writes wait in memory before they are flushed to the db
+SESSION_WRITE_DELAY = config('SESSION_WRITE_DELAY', default=5, cast=int)
+# Seconds between deletions of expired sessions
+SESSION_SWEEP_INTERVAL = 60 * 60
 
 # Database
 DATABASES = {
@@ -19,6 +26,59 @@ DATABASES = {
     )
 }
 
+# Cache: an in-process LRU tier in front of a cache shared by all workers.
+# Sessions, login throttling and namespace versions need every dyno to see
+# the same cache, with atomic add() and incr(), so production uses memcached;
+# the file based cache only suits a single development machine.
+if DEBUG:
+    SHARED_CACHE = {
+        'BACKEND': config(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default='/tmp/janani_home_cache'),
+        'OPTIONS': {
+            # The file based cache lists its whole directory on every write
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=2000, cast=int),
+        },
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': config(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.memcached.MemcachedCache'),
+        # host:port of the memcached servers, comma separated
+        'LOCATION': config('CACHE_LOCATION', cast=Csv()),
+    }
+    if SHARED_CACHE['BACKEND'] in ('django.core.cache.backends.filebased.FileBasedCache',
+                                   'django.core.cache.backends.locmem.LocMemCache'):
+        raise ImproperlyConfigured(
+            'CACHE_BACKEND must be a cache shared by all dynos, such as memcached.')
+CACHES = {
+    'default': {
+        'BACKEND': 'janani_home.cache_backends.TieredCache',
+        'OPTIONS': {
+            'SHARED_ALIAS': 'shared',
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,
+        },
+    },
+    'shared': dict(SHARED_CACHE, TIMEOUT=60 * 60),
+}
+
+# Seconds to keep results of the ORM query cache (see janani_home.query_cache)
+QUERY_CACHE_ENABLED = config('QUERY_CACHE_ENABLED', default=True, cast=bool)
+QUERY_CACHE_TIMEOUT = 60 * 60
+
+# Seconds browsers and proxies may keep, and then serve stale while they
+# revalidate, the public pages of anonymous visitors (see janani_home.conditional)
+PUBLIC_CACHE_MAX_AGE = config('PUBLIC_CACHE_MAX_AGE', default=60, cast=int)
+PUBLIC_CACHE_STALE_WHILE_REVALIDATE = 10 * 60
+
+# Minify rendered HTML and compress responses of at least this many bytes
+# (with Brotli when the brotli package is installed, see janani_home.middleware)
+HTML_MINIFY = config('HTML_MINIFY', default=True, cast=bool)
+COMPRESSION_MIN_LENGTH = 500
+
 # Email backend
 if DEBUG:
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
@@ -51,33 +111,53 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'janani_home.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'janani_home.middleware.LiteModeMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'janani_home.urls'
 
+CONTEXT_PROCESSORS = [
+    'django.template.context_processors.debug',
+    'django.template.context_processors.request',
+    'django.contrib.auth.context_processors.auth',
+    'django.contrib.messages.context_processors.messages',
+    'cms.context_processors.menu_processor',
+    'janani_home.context_processors.static_bundles',
+    'janani_home.context_processors.lite_mode',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates'),],
         'APP_DIRS': True,
         'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.debug',
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-                'cms.context_processors.menu_processor',
-            ],
+            'context_processors': CONTEXT_PROCESSORS,
         },
     },
 ]
 
+# Render the hot public templates found in jinja2/ with Jinja2; every other
+# template falls through to the Django engine.
+JINJA2_TEMPLATES = config('JINJA2_TEMPLATES', default=False, cast=bool)
+if JINJA2_TEMPLATES:
+    TEMPLATES.insert(0, {
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [os.path.join(BASE_DIR, 'jinja2')],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            'environment': 'janani_home.jinja2.environment',
+            'context_processors': CONTEXT_PROCESSORS,
+        },
+    })
+
 WSGI_APPLICATION = 'janani_home.wsgi.application'
 
 # Password validation
@@ -98,6 +178,15 @@ AUTH_PASSWORD_VALIDATORS = [
 
 # Authentication backend
 AUTHENTICATION_BACKENDS = ('accounts.backends.CustomModelBackend', )
+# Seconds to cache the user and profile of a session (0 disables the cache)
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=0, cast=int)
+
+# Login throttling: failed attempts allowed per window of seconds, per scope
+LOGIN_THROTTLE_CACHE = 'shared'
+LOGIN_THROTTLE_RATES = {
+    'ip': (20, 60),
+    'account': (5, 300),
+}
 
 # Internationalization
 LANGUAGE_CODE = 'en-us'
@@ -112,6 +201,27 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 STATICFILES_DIRS = (
     os.path.join(BASE_DIR, 'staticfiles'),
 )
+# Bundles are built, minified, hashed and precompressed by collectstatic
+STATICFILES_STORAGE = 'janani_home.storage_backends.BundledStaticFilesStorage'
+STATIC_BUNDLES = {
+    'site_css': ('css/site.min.css', ['css/main.css']),
+    'site_js': ('js/site.min.js', ['js/popover.js', 'js/ytresizer.js', 'js/facade.js']),
+    # Only loaded by the listing
+    'listing_js': ('js/listing.min.js', ['js/filtering.js']),
+    # The lite pages load these instead of Bootstrap, jQuery and the site bundles
+    'lite_css': ('css/lite.min.css', ['css/lite.css']),
+    'lite_js': ('js/lite.min.js', ['js/facade.js']),
+}
+CRITICAL_CSS = 'css/critical.css'
+# Bytes (compressed) the lite listing and detail pages may weigh with their
+# own static assets; checked by `manage.py check_page_budget`
+LITE_PAGE_BUDGET = 48 * 1024
+
+# Currency that amounts are converted to for filtering; exchange rates to it
+# are kept in educational_need.ExchangeRate
+BASE_CURRENCY = 'INR'
+# Lower bounds of the amount ranges of the listing filter, in BASE_CURRENCY
+AMOUNT_BUCKETS = (0, 5000, 10000, 25000, 50000, 100000, 250000)
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
@@ -140,7 +250,7 @@ THUMBNAIL_ALIASES = {
 }
 
 # Ckeditor
-CKEDITOR_JQUERY_URL = 'https://ajax.googleapis.com/ajax/libs/jquery/2.2.4/jquery.min.js'
+CKEDITOR_JQUERY_URL = STATIC_URL + 'js/vendor/jquery.min.js'
 CKEDITOR_CONFIGS = {
     'default': {
         'skin': 'moono',
@@ -0,0 +1,66 @@
+from django.test import SimpleTestCase, TestCase
+
+from cms.models import Page
+
+from .richtext import SANITIZER_VERSION, is_safe_url, render_rich_text
+
+
+class SanitizerTests(SimpleTestCase):
+
+    def test_allowed_urls(self):
+        for url in ('http://example.com', 'HTTPS://example.com', 'mailto:a@example.com',
+                    '/need/1/', 'page.html', '#top', '?page=2', 'a/b:c'):
+            self.assertTrue(is_safe_url(url), url)
+
+    def test_dangerous_urls(self):
+        for url in ('javascript:alert(1)', 'JavaScript:alert(1)', 'java\tscript:alert(1)',
+                    'java\nscript:alert(1)', ' javascript:alert(1)', 'java\x00script:alert(1)',
+                    'vbscript:msgbox(1)', 'data:text/html;base64,PHNjcmlwdD4='):
+            self.assertFalse(is_safe_url(url), repr(url))
+
+    def test_dangerous_links_lose_their_href(self):
+        html, text, excerpt = render_rich_text('<a href="java&#9;script:alert(1)">fees</a>')
+        self.assertEqual(html, '<a rel="nofollow noopener">fees</a>')
+        self.assertEqual(text, 'fees')
+
+    def test_scripts_are_dropped_with_their_content(self):
+        html, text, excerpt = render_rich_text('<p>Books<script>alert(1)</script></p><style>p {}</style>')
+        self.assertEqual(html, '<p>Books</p>')
+        self.assertEqual(text, 'Books')
+
+    def test_attributes_are_filtered(self):
+        html, text, excerpt = render_rich_text(
+            '<p onclick="x()" style="color: red">a</p><img src="/a.png" alt="&quot;x" onerror="x()">')
+        self.assertEqual(html, '<p>a</p><img src="/a.png" alt="&quot;x">')
+
+    def test_unknown_tags_keep_their_text(self):
+        html, text, excerpt = render_rich_text('<section><p>School <font>fees</font></p>')
+        self.assertEqual(html, '<p>School fees</p>')
+        self.assertEqual(text, 'School fees')
+
+    def test_unclosed_tags_are_closed(self):
+        html, text, excerpt = render_rich_text('<ul><li><b>one</ul>two')
+        self.assertEqual(html, '<ul><li><b>one</b></li></ul>two')
+
+    def test_excerpt(self):
+        html, text, excerpt = render_rich_text('<p>{}</p>'.format('word ' * 100))
+        self.assertLessEqual(len(excerpt), 160)
+        self.assertTrue(excerpt.endswith('...'))
+        self.assertEqual(render_rich_text(None), ('', '', ''))
+
+
+class RichTextColumnsTests(TestCase):
+
+    def test_outdated_rows_are_rendered_again_when_loaded(self):
+        page = Page.objects.create(title='About', slug='about', description='About',
+                                   content='<p>Hello</p>')
+        self.assertEqual(page.rich_text_version, SANITIZER_VERSION)
+        Page.objects.filter(pk=page.pk).update(
+            rich_text_version=SANITIZER_VERSION - 1, content_html='<a href="javascript:x">stale</a>')
+
+        page = Page.objects.get(pk=page.pk)
+        self.assertEqual(page.content_html, '<p>Hello</p>')
+        self.assertEqual(page.rich_text_version, SANITIZER_VERSION)
+        self.assertEqual(
+            list(Page.objects.values_list('content_html', 'rich_text_version')),
+            [('<p>Hello</p>', SANITIZER_VERSION)])
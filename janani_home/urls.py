@@ -3,8 +3,12 @@ from django.conf.urls import url, include
 from django.conf.urls.static import static
 from django.contrib import admin
 
+from . import views
+
 
 urlpatterns = [
+    url(r'^sw\.js$', views.service_worker, name='service_worker'),
+    url(r'^admin/cache-stats/$', views.cache_stats_view, name='cache_stats'),
     url(r'^admin/', admin.site.urls),
     url(r'^chaining/', include('smart_selects.urls')),
     url(r'^accounts/', include('accounts.urls')),
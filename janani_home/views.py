@@ -0,0 +1,57 @@
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.auth.decorators import user_passes_test
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.shortcuts import render
+
+from .cache import cache_stats
+from .context_processors import bundle_urls
+from .middleware import compression_stats
+
+# Static files of the app shell, besides the bundles
+SHELL_FILES = [
+    'js/vendor/jquery.min.js',
+    'font/GlacialIndifference.otf',
+    'font/Trocchi.otf',
+    'img/poster.png',
+    'img/avatar-male.jpg',
+    'img/avatar-female.jpg',
+]
+
+
+@user_passes_test(lambda u: u.is_superuser)
+def cache_stats_view(request):
+    """Returns the cache and compression counters of the worker answering the
+    request."""
+    stats = {alias: cache_stats(caches[alias]) for alias in ('default',)}
+    stats['compression'] = compression_stats()
+    return JsonResponse(stats)
+
+
+@functools.lru_cache()
+def _precache_urls():
+    # Hashed names come from the static manifest, so every deploy that
+    # changes an asset also changes the worker
+    urls = []
+    for name, sources in settings.STATIC_BUNDLES.values():
+        urls.extend(bundle_urls(name, sources))
+    urls.extend(staticfiles_storage.url(name) for name in SHELL_FILES)
+    return urls
+
+
+def service_worker(request):
+    """Returns the service worker script, with the app shell of this deploy."""
+    precache = _precache_urls()
+    context = {
+        'version': hashlib.md5(' '.join(precache).encode('utf-8')).hexdigest()[:12],
+        'precache': json.dumps(precache),
+    }
+    response = render(request, 'sw.js', context, content_type='application/javascript')
+    # Browsers check for a new worker on navigation; never let them keep an old one
+    response['Cache-Control'] = 'no-cache'
+    return response
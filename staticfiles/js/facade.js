@@ -0,0 +1,18 @@
+// Load the video player a click-to-load facade stands for. Plain DOM, as the
+// lite pages load this without jQuery
+document.addEventListener('click', function(event) {
+    var facade = event.target.closest ? event.target.closest('.video-facade[data-embed]') : null;
+    if (!facade) {
+        return;
+    }
+    event.preventDefault();
+    var src = facade.getAttribute('data-embed');
+    var player = document.createElement('iframe');
+    player.width = 560;
+    player.height = 315;
+    player.setAttribute('frameborder', '0');
+    player.setAttribute('allow', 'autoplay; fullscreen');
+    player.setAttribute('allowfullscreen', '');
+    player.src = src + (src.indexOf('?') === -1 ? '?' : '&') + 'autoplay=1';
+    facade.parentNode.replaceChild(player, facade);
+});
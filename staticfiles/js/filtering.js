@@ -1,19 +1,44 @@
 function triggerCountrySelectEvent(){
    val = $("#country").find(":selected").val();
    var ele = $("#state");
-   $.get('/accounts/country/states/?country_id='+val,function(response,status){
+   $.get('/accounts/country/states/?listed=1&country_id='+val,function(response,status){
      $("#state option").remove();
      var string_ = '<option value="">(All)</option>';
      for (var val in response) {
        val=response[val];
-       string_=string_+'<option value="'+val.id+'">'+val.name+'</option>';
+       string_=string_+'<option value="'+val.id+'">'+val.name+' ('+val.count+')</option>';
      }
      ele.append(string_)
        });
      //clear the state box
      ele.find("option:selected").removeAttr("selected");
+     fillOptions($("#district"), []);
+     fillOptions($("#city"), []);
  }
 
+function fillOptions(ele, items){
+  var string_ = '<option value="">(All)</option>';
+  for (var i = 0; i < items.length; i++) {
+    string_ = string_+'<option value="'+items[i].id+'">'+$('<span>').text(items[i].name).html()+'</option>';
+  }
+  ele.html(string_);
+}
+
+function triggerStateSelectEvent(){
+  var val = $("#state").find(":selected").val();
+  if (!val) {
+    fillOptions($("#district"), []);
+    fillOptions($("#city"), []);
+    return;
+  }
+  $.get('/accounts/state/districts/?state_id='+val, function(response){
+    fillOptions($("#district"), response);
+  });
+  $.get('/accounts/state/cities/?state_id='+val, function(response){
+    fillOptions($("#city"), response);
+  });
+}
+
 $(document).ready(function() {
 if ($("#country").val()!='') {
   val = $("#country").find(":selected").val();
@@ -25,14 +50,26 @@ $('#country').on('change',function(event) {
   /* Act on the event */
       triggerCountrySelectEvent();
    });
+$('#state').on('change',function(event) {
+  event.preventDefault();
+  triggerStateSelectEvent();
+});
 });
 
 $(document).ready(function() {
   function runSearch(){
     var country = $('#country').find(':selected').val()
     var state = $('#state').find(':selected').val()
+    var district = $('#district').find(':selected').val() || ''
+    var city = $('#city').find(':selected').val() || ''
+    var amount = $('#amount').find(':selected').val() || ''
     var query = $('#search').val()
-    window.location.href = "/?country="+country+"&state="+state+"&query="+query.trim();
+    var near = $('#near').val().trim()
+    var url = "/?country="+country+"&state="+state+"&district="+district+"&city="+city+"&amount="+amount+"&query="+encodeURIComponent(query.trim());
+    if (near) {
+      url += "&near="+encodeURIComponent(near)+"&km="+$('#km').val();
+    }
+    window.location.href = url;
   }
   $("#filter_button").on('click',function(event) {
     // event.preventDefault();
@@ -59,6 +96,12 @@ function runevent(event){
     return;
     runevent(event);
   });
+  $("#near").keydown(function(event) {
+    /* Act on the event */
+    if (event.which != 13 || event.keyCode != 13)
+    return;
+    runevent(event);
+  });
   $("#search").keydown(function(event) {
     /* Act on the event */
     if (event.which != 13 || event.keyCode != 13)
@@ -66,3 +109,35 @@ function runevent(event){
     runevent(event);
   });
 });
+
+/* Search suggestions: places open the filtered listing, titles the need */
+$(document).ready(function() {
+  var suggestions = {};
+  var timer = null;
+
+  function fetchSuggestions(query) {
+    $.get('/educational_need/autocomplete/', {q: query}, function(response) {
+      var options = '';
+      suggestions = {};
+      for (var i = 0; i < response.suggestions.length; i++) {
+        var suggestion = response.suggestions[i];
+        suggestions[suggestion.label] = suggestion.url;
+        options += '<option value="'+$('<span>').text(suggestion.label).html()+'">';
+      }
+      $('#search-suggestions').html(options);
+    });
+  }
+
+  $('#search').on('input', function(event) {
+    var query = $(this).val();
+    // Picking an option of the datalist sets the value to its label
+    if (suggestions.hasOwnProperty(query)) {
+      window.location.href = suggestions[query];
+      return;
+    }
+    clearTimeout(timer);
+    if (query.trim().length >= 2) {
+      timer = setTimeout(function() { fetchSuggestions(query); }, 150);
+    }
+  });
+});
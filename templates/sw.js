@@ -0,0 +1,287 @@
+// Service worker of Janani Home, rendered by janani_home.views.service_worker
+//
+// - The app shell (bundles, fonts, placeholder avatars) is precached and
+//   served from the cache; the cache name changes with every deploy.
+// - The listing and detail pages are served stale-while-revalidate, but only
+//   public (anonymous) responses are ever kept.
+// - Contact messages and comments submitted while offline are stored and
+//   sent again when the connection is back. They are deleted once the server
+//   accepted them, retried with backoff on server errors, and handed back to
+//   the page when the server refused them (e.g. logged out, CSRF token
+//   rotated), so the text isn't lost.
+
+var VERSION = '{{ version }}';
+var SHELL_CACHE = 'shell-' + VERSION;
+var PAGE_CACHE = 'pages';
+var PRECACHE = {{ precache|safe }};
+var PAGES = [/^\/$/, /^\/educational_need\/\d+\/$/];
+var QUEUED_POSTS = [
+    // The contact form answers with the detail page itself
+    {pattern: /^\/educational_need\/\d+\/$/, succeeded: function(response) {
+        return response.ok && !response.redirected;
+    }},
+    // Comments redirect to a confirmation page
+    {pattern: /^\/comment\/educational_need\/\d+\/$/, succeeded: function(response) {
+        return response.ok && response.redirected &&
+            new URL(response.url).pathname === '{% url "comment_submitted" %}';
+    }}
+];
+var LOGIN_PATH = '{% url "login" %}';
+var QUEUE_DB = 'janani-home-queue';
+var RETRY_DELAY = 30 * 1000;
+var MAX_RETRY_DELAY = 60 * 60 * 1000;
+
+function matches(patterns, path) {
+    return patterns.some(function(pattern) { return pattern.test(path); });
+}
+
+function queuedPostRoute(path) {
+    return QUEUED_POSTS.filter(function(route) { return route.pattern.test(path); })[0];
+}
+
+self.addEventListener('install', function(event) {
+    event.waitUntil(caches.open(SHELL_CACHE).then(function(cache) {
+        return cache.addAll(PRECACHE);
+    }).then(function() {
+        return self.skipWaiting();
+    }));
+});
+
+self.addEventListener('activate', function(event) {
+    event.waitUntil(caches.keys().then(function(names) {
+        return Promise.all(names.filter(function(name) {
+            return name !== SHELL_CACHE && name !== PAGE_CACHE;
+        }).map(function(name) {
+            return caches.delete(name);
+        }));
+    }).then(function() {
+        return self.clients.claim();
+    }).then(function() {
+        return replayQueue().catch(function() {});
+    }));
+});
+
+/* Pages */
+
+function isPublic(response) {
+    return response.ok && /\bpublic\b/.test(response.headers.get('Cache-Control') || '');
+}
+
+function staleWhileRevalidate(event) {
+    var request = event.request;
+    return caches.open(PAGE_CACHE).then(function(cache) {
+        return cache.match(request, {ignoreVary: true}).then(function(cached) {
+            var network = fetch(request).then(function(response) {
+                if (isPublic(response)) {
+                    cache.put(request, response.clone());
+                } else {
+                    // Logged in: personal pages must never be served to others
+                    caches.delete(PAGE_CACHE);
+                }
+                return response;
+            });
+            if (cached) {
+                event.waitUntil(network.catch(function() {}));
+                return cached;
+            }
+            return network;
+        });
+    });
+}
+
+/* Queued form submissions */
+
+function openQueue() {
+    return new Promise(function(resolve, reject) {
+        var open = indexedDB.open(QUEUE_DB, 1);
+        open.onupgradeneeded = function() {
+            open.result.createObjectStore('posts', {autoIncrement: true});
+        };
+        open.onsuccess = function() { resolve(open.result); };
+        open.onerror = function() { reject(open.error); };
+    });
+}
+
+function enqueue(post) {
+    return openQueue().then(function(db) {
+        return new Promise(function(resolve, reject) {
+            var transaction = db.transaction('posts', 'readwrite');
+            transaction.objectStore('posts').add(post);
+            transaction.oncomplete = function() { resolve(); };
+            transaction.onerror = function() { reject(transaction.error); };
+        });
+    });
+}
+
+function readQueue() {
+    return openQueue().then(function(db) {
+        return new Promise(function(resolve, reject) {
+            var posts = [];
+            var transaction = db.transaction('posts', 'readonly');
+            transaction.objectStore('posts').openCursor().onsuccess = function(event) {
+                var cursor = event.target.result;
+                if (cursor) {
+                    posts.push({key: cursor.key, post: cursor.value});
+                    cursor.continue();
+                }
+            };
+            transaction.oncomplete = function() { resolve({db: db, posts: posts}); };
+            transaction.onerror = function() { reject(transaction.error); };
+        });
+    });
+}
+
+function notifyRejected(item) {
+    var fields = new URLSearchParams(item.post.body);
+    return self.clients.matchAll({type: 'window', includeUncontrolled: true}).then(function(clients) {
+        clients.forEach(function(client) {
+            client.postMessage({
+                type: 'queued-post-rejected',
+                key: item.key,
+                url: item.post.url,
+                status: item.post.status,
+                text: fields.get('message') || fields.get('comment') || ''
+            });
+        });
+    });
+}
+
+function sendQueued(db, item) {
+    // Resolves to true when the post is settled, false when it must be retried
+    var store = function() { return db.transaction('posts', 'readwrite').objectStore('posts'); };
+    var retryLater = function() {
+        item.post.attempts = (item.post.attempts || 0) + 1;
+        item.post.nextAttempt = Date.now() + Math.min(RETRY_DELAY * Math.pow(2, item.post.attempts - 1), MAX_RETRY_DELAY);
+        store().put(item.post, item.key);
+        return false;
+    };
+    return fetch(item.post.url, {
+        method: 'POST',
+        body: item.post.body,
+        credentials: 'same-origin',
+        headers: {'Content-Type': item.post.contentType}
+    }).then(function(response) {
+        var route = queuedPostRoute(new URL(item.post.url).pathname);
+        if (route && route.succeeded(response)) {
+            store().delete(item.key);
+            return true;
+        }
+        if (response.status >= 500) {
+            return retryLater();
+        }
+        // Refused: sending it again won't help, the user has to
+        item.post.rejected = true;
+        item.post.status = response.redirected && new URL(response.url).pathname === LOGIN_PATH ?
+            'login' : response.status;
+        store().put(item.post, item.key);
+        return notifyRejected(item).then(function() { return true; });
+    }, retryLater);
+}
+
+function replayQueue() {
+    // Resolves to true when nothing is left to retry
+    return readQueue().then(function(queue) {
+        var now = Date.now();
+        return Promise.all(queue.posts.map(function(item) {
+            if (item.post.rejected) {
+                return true;
+            }
+            if (item.post.nextAttempt > now) {
+                return false;
+            }
+            return sendQueued(queue.db, item);
+        }));
+    }).then(function(settled) {
+        return settled.every(Boolean);
+    });
+}
+
+function reportRejected() {
+    return readQueue().then(function(queue) {
+        return Promise.all(queue.posts.filter(function(item) {
+            return item.post.rejected;
+        }).map(notifyRejected));
+    });
+}
+
+function discardQueued(key) {
+    return openQueue().then(function(db) {
+        db.transaction('posts', 'readwrite').objectStore('posts').delete(key);
+    });
+}
+
+self.addEventListener('message', function(event) {
+    var data = event.data || {};
+    if (data.type === 'report-rejected-posts') {
+        event.waitUntil(reportRejected());
+    } else if (data.type === 'discard-queued-post') {
+        event.waitUntil(discardQueued(data.key));
+    }
+});
+
+function queuedPost(request) {
+    var copy = request.clone();
+    return fetch(request).catch(function() {
+        return copy.text().then(function(body) {
+            return enqueue({
+                url: copy.url,
+                body: body,
+                contentType: copy.headers.get('Content-Type')
+            });
+        }).then(function() {
+            if (self.registration.sync) {
+                self.registration.sync.register('replay-posts');
+            }
+            return new Response(
+                '<!DOCTYPE html><meta name="viewport" content="width=device-width, initial-scale=1">' +
+                '<p>You are offline. Your message has been saved and will be sent as soon as ' +
+                'the connection is back.</p><p><a href="javascript:history.back()">&laquo; Back</a></p>',
+                {status: 202, headers: {'Content-Type': 'text/html; charset=utf-8'}});
+        });
+    });
+}
+
+self.addEventListener('sync', function(event) {
+    if (event.tag === 'replay-posts') {
+        // A rejected promise makes the browser retry the sync later
+        event.waitUntil(replayQueue().then(function(done) {
+            if (!done) {
+                throw new Error('Queued posts are waiting for a retry');
+            }
+        }));
+    }
+});
+
+/* Routing */
+
+self.addEventListener('fetch', function(event) {
+    var request = event.request;
+    var url = new URL(request.url);
+    if (url.origin !== location.origin) {
+        return;
+    }
+    if (request.method === 'POST') {
+        // Logging in or out, or changing anything, makes cached pages stale
+        caches.delete(PAGE_CACHE);
+        var urlencoded = (request.headers.get('Content-Type') || '').indexOf('application/x-www-form-urlencoded') === 0;
+        if (urlencoded && queuedPostRoute(url.pathname)) {
+            event.respondWith(queuedPost(request));
+        }
+        return;
+    }
+    if (request.method !== 'GET') {
+        return;
+    }
+    if (PRECACHE.indexOf(url.pathname) !== -1) {
+        event.respondWith(caches.match(request).then(function(cached) {
+            return cached || fetch(request);
+        }));
+    } else if (request.mode === 'navigate' && matches(PAGES, url.pathname)) {
+        if (!self.registration.sync) {
+            event.waitUntil(replayQueue().catch(function() {}));
+        }
+        event.respondWith(staleWhileRevalidate(event));
+    } else if (request.mode === 'navigate' && url.pathname === '{% url "logout" %}') {
+        caches.delete(PAGE_CACHE);
+    }
+});